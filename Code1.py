@@ -1,8 +1,10 @@
 import akshare as ak
+import fetch_scheduler
 import pandas as pd
+from frame_schema import normalize_spot_em
 
 # 获取当日A股市场现货数据（包含涨跌幅字段）
-stock_zh_a_spot_df = ak.stock_zh_a_spot_em()
+stock_zh_a_spot_df = normalize_spot_em(fetch_scheduler.call("akshare", ak.stock_zh_a_spot_em))
 
 # 通常情况下，某些API返回的涨跌幅会以百分比形式表示，我们这里假设字段名称为'涨跌幅'，该字段已是百分比形式
 # 如果是小数形式，则需要将其乘以100
@@ -1,5 +1,6 @@
 
 import akshare as ak
+import fetch_scheduler
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -11,7 +12,7 @@ import numpy as np
 def fetch_stock_data(stock_code):
     # Fetch daily stock data using akshare
     # 新浪源 df = ak.stock_zh_a_daily(symbol=stock_code, adjust="qfq")
-    df = ak.stock_zh_a_hist(symbol=stock_code, adjust="qfq").iloc[:, :6]
+    df = fetch_scheduler.call("akshare", ak.stock_zh_a_hist, symbol=stock_code, adjust="qfq").iloc[:, :6]
     df.columns = [
         'date',
         'open',
@@ -1,4 +1,4 @@
-import akshare as ak
+from bar_store import get_stock_hist
 import backtrader as bt
 import datetime
 import pandas as pd
@@ -30,9 +30,9 @@ class MA20Strategy(bt.Strategy):
             self.sell()
 
 def run_backtest(stock_code, start_date, end_date):
-    # 使用akshare获取股票数据
+    # 从本地日线仓库获取股票数据
     try:
-        df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date)
+        df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date)
     except Exception as e:
         print(f"获取股票数据时出错: {e}")
         return
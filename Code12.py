@@ -1,20 +1,54 @@
 
 import akshare as ak
+import fetch_scheduler
+import numpy as np
 import pandas as pd
 from datetime import datetime, time, date
-import time as time_module
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import schedule
 import json
+import trade_calendar
+from bar_store import get_stock_hist
+from spot_index import SpotIndex
+from alert_rules import RuleSet
 
 # 钉钉机器人配置
 DINGTALK_WEBHOOK = "https://oapi.dingtalk.com/robot/send?access_token=YOUR_ACCESS_TOKEN"
 
-# 股票代码数组
+# 股票代码数组；只有和新浪A股快照写法一致的代码（如 sz000001）能查到行情，快照里没有指数
 STOCK_CODES = ["000001", "399001"]  # 上证指数、深证成指
 
-# 用于跟踪每日报警状态的字典
-daily_alerts = {}
+# 报警规则：规则名 -> 表达式，可用的列见 build_rule_columns
+# 例如 "大跌": "pct_change < -3"、"冲高": "high / prev_close > 1.05"、"放量": "volume_ratio > 2"
+ALERT_RULES = {
+    "低于5日均线": "price < ma5",
+}
+
+# 报警规则可以用的列，与 build_rule_columns 一致
+RULE_COLUMNS = ('price', 'open', 'high', 'low', 'prev_close', 'pct_change', 'volume', 'amount', 'ma5', 'volume_ratio')
+
+# 快照的成交量单位是股，历史日线的成交量单位是手
+SHARES_PER_LOT = 100
+
+# 每个交易日的交易分钟数
+SESSION_MINUTES = 240
+
+# 检查间隔（秒），按固定节拍执行，不受单次检查耗时影响
+CHECK_INTERVAL = 60
+
+# 单次检查的截止时间（秒），超时就放弃这一轮，保证下一轮准时开始
+TICK_DEADLINE = 50
+
+# 阻塞的行情请求、历史数据加载和钉钉推送都放到这个线程池里执行
+EXECUTOR_WORKERS = 16
+
+# 今天已经报警过的 (股票代码, 规则名)
+daily_alerts = set()
+
+alert_rules = RuleSet(ALERT_RULES, available=RULE_COLUMNS)
+for rule_name, reason in alert_rules.rejected.items():
+    print(f"报警规则「{rule_name}」无效，已忽略：{reason}")
 
 def send_dingtalk_message(message):
     headers = {"Content-Type": "application/json"}
@@ -26,25 +60,41 @@ def send_dingtalk_message(message):
     if response.status_code != 200:
         print(f"Failed to send message to DingTalk: {response.text}")
 
-def get_5day_average(stock_code):
-    try:
-        end_date = datetime.now().strftime('%Y%m%d')
-        start_date = (datetime.now() - pd.Timedelta(days=10)).strftime('%Y%m%d')
-        df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="")
+class DailyCloseCache:
+    """每个交易日只加载一次前几个交易日的收盘价和成交量，盘中计算5日线和量比不再请求历史数据"""
 
-        if len(df) < 5:
-            return None, f"Error: Not enough data available for {stock_code}. Only {len(df)} days found."
+    def __init__(self):
+        self.trade_date = None
+        self.errors = {}
+        self.prior_sum_array = np.full(len(STOCK_CODES), np.nan)
+        self.prior_volume_array = np.full(len(STOCK_CODES), np.nan)
 
-        latest_open = df.iloc[-1]['开盘']
-        previous_closes = df.iloc[-5:-1]['收盘'].tolist()
+    @staticmethod
+    def load_prior(stock_code, today):
+        """读取 today 之前4个交易日的收盘价之和、5个交易日的日均成交量（手），返回 ((和, 均量), 错误信息)"""
+        start_date = trade_calendar.offset_trading_day(today, -10).strftime('%Y%m%d')
+        end_date = trade_calendar.previous_trading_day(today).strftime('%Y%m%d')
+        try:
+            # 历史日线接口用不带前缀的6位代码
+            df = get_stock_hist(stock_code[-6:], start_date, end_date, adjust="", columns=['日期', '收盘', '成交量'])
+            if len(df) < 5:
+                return None, f"Error: Not enough data available for {stock_code}. Only {len(df)} days found."
+            return (df['收盘'].iloc[-4:].sum(), df['成交量'].iloc[-5:].mean()), None
+        except Exception as e:
+            return None, f"Error occurred for {stock_code}: {str(e)}"
 
-        five_day_values = previous_closes + [latest_open]
-        five_day_average = sum(five_day_values) / 5
+    def update(self, today, loaded):
+        """loaded 为 {代码: ((和, 均量), 错误信息)}"""
+        self.trade_date = today
+        self.errors = {code: error for code, (prior, error) in loaded.items() if error is not None}
+        # 按 STOCK_CODES 顺序排好的数组，盘中向量化计算5日线和量比
+        priors = [loaded[code][0] or (np.nan, np.nan) for code in STOCK_CODES]
+        self.prior_sum_array = np.array([total for total, _ in priors], dtype=float)
+        self.prior_volume_array = np.array([volume for _, volume in priors], dtype=float)
 
-        return five_day_average, None
 
-    except Exception as e:
-        return None, f"Error occurred for {stock_code}: {str(e)}"
+# 历史收盘价缓存，跨交易日时重新加载
+close_cache = DailyCloseCache()
 
 def is_trading_time():
     now = datetime.now().time()
@@ -55,83 +105,142 @@ def is_trading_time():
     
     return (morning_start <= now <= morning_end) or (afternoon_start <= now <= afternoon_end)
 
-def reset_daily_alerts():
-    global daily_alerts
-    daily_alerts = {code: False for code in STOCK_CODES}
+def elapsed_trading_minutes(now):
+    """开盘以来已经交易的分钟数（扣除午休），至少为1"""
+    minutes = now.hour * 60 + now.minute
+    morning = min(max(minutes - (9 * 60 + 30), 0), 120)
+    afternoon = min(max(minutes - 13 * 60, 0), 120)
+    return max(morning + afternoon, 1)
 
-def check_stock_prices():
+def reset_daily_alerts():
     global daily_alerts
-    today = date.today()
-    
-    if today not in daily_alerts:
+    daily_alerts = set()
+
+def fetch_spot_index():
+    # 获取所有股票的实时数据，建立 代码 -> 行 的索引
+    return SpotIndex(fetch_scheduler.call("akshare", ak.stock_zh_a_spot))
+
+def build_rule_columns(real_time_data):
+    """把快照和指标整理成与 STOCK_CODES 对齐的数组，供报警规则使用"""
+    rows = real_time_data.rows_of(STOCK_CODES)
+    found = rows >= 0
+
+    def take(column):
+        values = np.full(len(STOCK_CODES), np.nan)
+        values[found] = pd.to_numeric(real_time_data.column(column)[rows[found]], errors='coerce')
+        return values
+
+    columns = {
+        'price': take('最新价'),
+        'open': take('今开'),
+        'high': take('最高'),
+        'low': take('最低'),
+        'prev_close': take('昨收'),
+        'pct_change': take('涨跌幅'),
+        'volume': take('成交量'),
+        'amount': take('成交额'),
+    }
+    # 5日均线 = (前4日收盘价之和 + 当日开盘价) / 5
+    columns['ma5'] = (close_cache.prior_sum_array + columns['open']) / 5
+    # 量比 = 今日每分钟成交量 / 前5日平均每分钟成交量
+    minute_volume = columns['volume'] / SHARES_PER_LOT / elapsed_trading_minutes(datetime.now())
+    with np.errstate(invalid='ignore', divide='ignore'):
+        columns['volume_ratio'] = minute_volume / (close_cache.prior_volume_array / SESSION_MINUTES)
+    return columns, found
+
+def check_stock_prices(real_time_data):
+    """用一份实时快照对全部自选股计算全部报警规则，返回需要推送的报警消息"""
+    columns, found = build_rule_columns(real_time_data)
+    for stock_code in np.array(STOCK_CODES)[~found]:
+        print(f"{stock_code} not found in snapshot：A股快照里没有这个代码（快照代码带 sh/sz/bj 前缀，且不含指数）")
+    for stock_code, error in close_cache.errors.items():
+        print(error)
+
+    messages = []
+    symbol_idx, rule_idx = alert_rules.triggered(columns)
+    for i, r in zip(symbol_idx, rule_idx):
+        stock_code, rule_name = STOCK_CODES[i], alert_rules.names[r]
+        if (stock_code, rule_name) in daily_alerts:
+            continue  # 如果今天已经报过这条警，跳过
+        stock_name = real_time_data.get(stock_code, '名称')
+        current_price = columns['price'][i]
+        message = f"警报：{stock_name}（{stock_code}）触发规则「{rule_name}」（{ALERT_RULES[rule_name]}），当前价格 {current_price:.2f}"
+        print(message)
+        messages.append(message)
+        daily_alerts.add((stock_code, rule_name))
+
+    print(f"已检查 {int(found.sum())} 只股票、{len(alert_rules.names)} 条规则，触发 {len(symbol_idx)} 条")
+    return messages
+
+
+class StockMonitor:
+    """asyncio 监控引擎：阻塞调用都交给有上限的线程池，事件循环只负责节拍、超时和调度"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.pending_notifications = set()
+
+    async def run_blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def refresh_close_cache(self, today):
+        # 换日时重置报警状态，所有自选股的历史收盘价并发加载
         reset_daily_alerts()
+        results = await asyncio.gather(*(self.run_blocking(DailyCloseCache.load_prior, code, today)
+                                         for code in STOCK_CODES))
+        close_cache.update(today, dict(zip(STOCK_CODES, results)))
+
+    def notify(self, message):
+        # 钉钉推送不等待结果，慢的推送不会拖住下一轮检查
+        task = asyncio.ensure_future(self.run_blocking(send_dingtalk_message, message))
+        self.pending_notifications.add(task)
+        task.add_done_callback(self._notification_done)
+
+    def _notification_done(self, task):
+        self.pending_notifications.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Failed to send message to DingTalk: {task.exception()}")
+
+    async def tick(self):
+        today = date.today()
+        if close_cache.trade_date != today:
+            # 历史数据加载和实时行情请求同时进行
+            _, real_time_data = await asyncio.gather(self.refresh_close_cache(today),
+                                                     self.run_blocking(fetch_spot_index))
+        else:
+            real_time_data = await self.run_blocking(fetch_spot_index)
+        for message in check_stock_prices(real_time_data):
+            self.notify(message)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            if trade_calendar.is_trading_day(date.today()) and is_trading_time():
+                try:
+                    await asyncio.wait_for(self.tick(), TICK_DEADLINE)
+                except asyncio.TimeoutError:
+                    print(f"本轮检查超过 {TICK_DEADLINE} 秒未完成，已跳过")
+                except Exception as e:
+                    print(f"Error checking stock prices: {str(e)}")
+            else:
+                print("当前不在交易时间，跳过检查")
+
+            # 按固定节拍计算下一轮时间，检查耗时不会累积成漂移
+            next_tick += CHECK_INTERVAL
+            while next_tick <= loop.time():
+                next_tick += CHECK_INTERVAL
+            await asyncio.sleep(next_tick - loop.time())
 
-    if is_trading_time():
-        try:
-            # 获取所有股票的实时数据
-            real_time_data = ak.stock_zh_a_spot()
-
-            for stock_code in STOCK_CODES:
-                if daily_alerts[stock_code]:
-                    continue  # 如果今天已经报警过，跳过这只股票
-
-                # 获取5日均线
-                five_day_average, error = get_5day_average(stock_code)
-                if error:
-                    print(error)
-                    continue
-
-                # 获取实时价格
-                stock_data = real_time_data[real_time_data['代码'] == stock_code]
-                
-                if stock_data.empty:
-                    print(f"No real-time data found for stock {stock_code}")
-                    continue
-
-                current_price = stock_data.iloc[0]['最新价']
-                stock_name = stock_data.iloc[0]['名称']
-
-                # 比较实时价格与5日均线
-                if current_price < five_day_average and not daily_alerts[stock_code]:
-                    message = f"警报：{stock_name}（{stock_code}）当前价格 {current_price:.2f} 低于5日均线 {five_day_average:.2f}"
-                    print(message)
-                    send_dingtalk_message(message)
-                    daily_alerts[stock_code] = True
-                else:
-                    print(f"{stock_name}（{stock_code}）当前价格 {current_price:.2f}，5日均线 {five_day_average:.2f}")
-
-        except Exception as e:
-            print(f"Error checking stock prices: {str(e)}")
-    else:
-        print("当前不在交易时间，跳过检查")
-
-def is_weekday():
-    return datetime.now().weekday() < 5
 
 def main():
     # 初始化每日报警状态
     reset_daily_alerts()
 
-    # 设置每分钟执行一次检查，但只在工作日的指定时间段内运行
-    schedule.every(1).minutes.do(check_stock_prices).tag('monitoring')
-
-    # 设置每天零点重置报警状态
-    schedule.every().day.at("00:00").do(reset_daily_alerts).tag('reset')
-
     print(f"开始监控股票 {', '.join(STOCK_CODES)}，将在交易时间内每分钟检查一次...")
-    
-    while True:
-        if is_weekday():
-            schedule.run_pending()
-        else:
-            print("今天是周末，不执行监控")
-            # 清除所有预定的任务，确保下一个工作日重新开始
-            schedule.clear('monitoring')
-            # 重新设置任务
-            schedule.every(1).minutes.do(check_stock_prices).tag('monitoring')
-            # 等待到下一个工作日
-            time_module.sleep(24 * 60 * 60)  # 睡眠24小时
-        time_module.sleep(1)
+
+    with ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS) as executor:
+        asyncio.run(StockMonitor(executor).run())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
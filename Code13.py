@@ -5,7 +5,7 @@
 
 # 首先,让我们导入必要的库并获取股票数据:
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 
 # 获取贵州茅台的股票数据
@@ -13,7 +13,7 @@ stock_code = "600519"  # 贵州茅台的股票代码
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 
 # 将日期列设置为索引
 df['日期'] = pd.to_datetime(df['日期'])
@@ -28,7 +28,7 @@ print(df.head())
 # 1. 快慢移动平均线
 # 快慢移动平均线是一种简单而有效的趋势跟踪方法。我们将使用20日均线作为快线,50日均线作为慢线。
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import matplotlib.pyplot as plt
 from ta.trend import SMAIndicator
@@ -41,7 +41,7 @@ stock_code = "600519"
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 df['日期'] = pd.to_datetime(df['日期'])
 df.set_index('日期', inplace=True)
 
@@ -71,7 +71,7 @@ print(df[df['Signal'] != df['Signal'].shift(1)])
 # 2. 移动平均线 + MACD
 # 这种方法结合了趋势跟踪(移动平均线)和动量指标(MACD)。
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import matplotlib.pyplot as plt
 from ta.trend import SMAIndicator, MACD
@@ -84,7 +84,7 @@ stock_code = "600519"
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 df['日期'] = pd.to_datetime(df['日期'])
 df.set_index('日期', inplace=True)
 
@@ -124,7 +124,7 @@ print(df[df['Signal'] != df['Signal'].shift(1)])
 # 3. RSI + 快慢移动平均线
 # 这种方法结合了超买超卖指标(RSI)和趋势跟踪(移动平均线)。
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import matplotlib.pyplot as plt
 from ta.trend import SMAIndicator
@@ -138,7 +138,7 @@ stock_code = "600519"
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 df['日期'] = pd.to_datetime(df['日期'])
 df.set_index('日期', inplace=True)
 
@@ -178,7 +178,7 @@ print(df[df['Signal'] != df['Signal'].shift(1)])
 # 4. 布林线和RSI
 # 布林线提供了价格波动的范围,而RSI则提供了动量信息。
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import matplotlib.pyplot as plt
 from ta.volatility import BollingerBands
@@ -192,7 +192,7 @@ stock_code = "600519"
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 df['日期'] = pd.to_datetime(df['日期'])
 df.set_index('日期', inplace=True)
 
@@ -235,7 +235,7 @@ print(df[df['Signal'] != df['Signal'].shift(1)])
 # 5. ADX与快慢移动平均线
 # ADX(平均趋向指标)用于衡量趋势的强度,而不是趋势的方向。
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import matplotlib.pyplot as plt
 from ta.trend import ADXIndicator, SMAIndicator
@@ -248,7 +248,7 @@ stock_code = "600519"
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 df['日期'] = pd.to_datetime(df['日期'])
 df.set_index('日期', inplace=True)
 
@@ -288,7 +288,7 @@ print(df[df['Signal'] != df['Signal'].shift(1)])
 ## 6. 移动平均线 + MACD + RSI
 # 这种方法结合了趋势跟踪(移动平均线)、动量(MACD)和超买超卖(RSI)指标。
 
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import matplotlib.pyplot as plt
 from ta.trend import SMAIndicator, MACD
@@ -302,7 +302,7 @@ stock_code = "600519"
 start_date = "20240101"
 end_date = "20241018"
 
-df = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
+df = get_stock_hist(symbol=stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
 df['日期'] = pd.to_datetime(df['日期'])
 df.set_index('日期', inplace=True)
 
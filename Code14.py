@@ -8,10 +8,11 @@
 # 描述：获取各大交易所交易日历数据,默认提取的是上交所
 # 积分：需2000积分
 import tushare as ts
+import fetch_scheduler
 import datetime
 # 接口实例
 pro = ts.pro_api()
-df = pro.trade_cal(exchange='', start_date='20180101', end_date='20181231')
+df = fetch_scheduler.call("tushare", pro.trade_cal, exchange='', start_date='20180101', end_date='20181231')
 
 # 既然有这个接口了， 我们传递一个足够长的时间（比如10天， 我们A股的休假传统最长也不过8天吧）， 开始时间传递  今天-10天，  
 # 结束时间传递今天。那么 我们根据接口倒序获取数据，最近的交易日 是不是第1天获取1的数据，  
@@ -27,7 +28,7 @@ def get_latest_trading_day():
     today = datetime.now().date()
     
     # Get the trading calendar for the past week
-    cal_df = pro.trade_cal(exchange='', start_date=(today - timedelta(days=10)).strftime('%Y%m%d'), end_date=today.strftime('%Y%m%d'))
+    cal_df = fetch_scheduler.call("tushare", pro.trade_cal, exchange='', start_date=(today - timedelta(days=10)).strftime('%Y%m%d'), end_date=today.strftime('%Y%m%d'))
     
     # Filter for open trading days and sort in descending order
     open_days = cal_df[cal_df['is_open'] == 1]['cal_date'].sort_values(ascending=False)
@@ -42,7 +43,7 @@ def get_previous_trading_day(date):
     end_date = datetime.strptime(date, '%Y%m%d').date()
     start_date = end_date - timedelta(days=7)
     
-    cal_df = pro.trade_cal(exchange='', start_date=start_date.strftime('%Y%m%d'), end_date=date)
+    cal_df = fetch_scheduler.call("tushare", pro.trade_cal, exchange='', start_date=start_date.strftime('%Y%m%d'), end_date=date)
     
     # Filter for open trading days and sort in descending order
     open_days = cal_df[cal_df['is_open'] == 1]['cal_date'].sort_values(ascending=False)
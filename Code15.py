@@ -15,11 +15,11 @@
 
 
 import streamlit as st
-import pywencai
+import wencai_cache
 import pandas as pd
-from datetime import datetime, timedelta
-import tushare as ts
+from datetime import datetime
 import plotly.graph_objects as go
+import trade_calendar
 
 # Setting up pandas display options
 pd.set_option('display.unicode.ambiguous_as_wide', True)
@@ -29,49 +29,17 @@ pd.set_option('display.max_columns', None)
 pd.set_option('display.expand_frame_repr', False)
 pd.set_option('display.max_colwidth', 100)
 
-# Initialize Tushare with your token
-ts.set_token('YOUR_TUSHARE_TOKEN')
-pro = ts.pro_api()
-
 def get_latest_trading_day():
-    now = datetime.now()
-    today = now.date()
-
-    # Get the trading calendar for the past week
-    cal_df = pro.trade_cal(exchange='', start_date=(today - timedelta(days=10)).strftime('%Y%m%d'), end_date=today.strftime('%Y%m%d'))
-
-    # Filter for open trading days and sort in descending order
-    open_days = cal_df[cal_df['is_open'] == 1]['cal_date'].sort_values(ascending=False)
-
-    # Check if today is a trading day
-    is_trading_day = cal_df[cal_df['cal_date'] == today.strftime('%Y%m%d')]['is_open'].iloc[0] == 1
-
-    if is_trading_day:
-        # If it's before 9：30 AM on a trading day, use the previous trading day
-        if now.time() < datetime.strptime('09:30', '%H:%M').time():
-            return open_days.iloc[1]
-        else:
-            return open_days.iloc[0]
-    else:
-        # If today is not a trading day, use the most recent trading day
-        return open_days.iloc[0]
+    # 交易日9：30之前取前一交易日，非交易日取最近一个交易日（本地交易日历）
+    return trade_calendar.latest_trading_day(datetime.now()).strftime('%Y%m%d')
 
 def get_previous_trading_day(date):
-    # Get the trading calendar for the past week before the given date
-    end_date = datetime.strptime(date, '%Y%m%d').date()
-    start_date = end_date - timedelta(days=10)
-
-    cal_df = pro.trade_cal(exchange='', start_date=start_date.strftime('%Y%m%d'), end_date=date)
-
-    # Filter for open trading days and sort in descending order
-    open_days = cal_df[cal_df['is_open'] == 1]['cal_date'].sort_values(ascending=False)
-
-    # Return the previous trading day
-    return open_days.iloc[1]  # iloc[1] because iloc[0] would be the input date itself
+    # Return the previous trading day from the local trading calendar
+    return trade_calendar.previous_trading_day(date).strftime('%Y%m%d')
 
 def get_limit_up_data(date):
     param = f"{date}涨停，非涉嫌信息披露违规且非立案调查且非ST，非科创板，非北交所"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc')
+    df = wencai_cache.get(query=param, sort_key='成交金额', sort_order='desc')
     selected_columns = ['股票代码', '股票简称', '最新价', '最新涨跌幅', f'首次涨停时间[{date}]', 
                         f'连续涨停天数[{date}]', f'涨停原因类别[{date}]', f'a股市值(不含限售股)[{date}]', 
                         f'涨停类型[{date}]']
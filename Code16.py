@@ -3,8 +3,11 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import tushare as ts
-import pywencai
 from datetime import datetime, timedelta
+import fetch_scheduler
+import symbol_registry
+import trade_calendar
+import wencai_cache
 
 # Initialize Tushare with your token
 ts.set_token('Tushare with your token')
@@ -13,50 +16,47 @@ pro = ts.pro_api()
 
 def get_limit_up_stocks(date):
     query = f"{date}涨停"
-    df = pywencai.get(query=query, sort_key='涨跌幅', sort_order='desc')
+    df = wencai_cache.get(query=query, sort_key='涨跌幅', sort_order='desc')
     return df[['股票代码', '股票简称', '最新价', '最新涨跌幅']]
 
 
 def get_next_trading_day(date):
-    next_day = (datetime.strptime(date, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
-    while True:
-        df = pro.trade_cal(exchange='', start_date=next_day, end_date=next_day)
-        if df.iloc[0]['is_open'] == 1:
-            return next_day
-        next_day = (datetime.strptime(next_day, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+    # 本地交易日历二分查找，不再逐日调用 pro.trade_cal
+    return trade_calendar.next_trading_day(date).strftime('%Y%m%d')
 
 
 def get_stock_data(stock_code, start_date, end_date):
-    df = pro.daily(ts_code=stock_code, start_date=start_date, end_date=end_date)
+    # 问财、东财、新浪的代码写法统一转成 tushare 的 ts_code
+    ts_code = symbol_registry.to_style([stock_code], 'ts')[0]
+    df = fetch_scheduler.call("tushare", pro.daily, ts_code=ts_code, start_date=start_date, end_date=end_date)
     df['trade_date'] = pd.to_datetime(df['trade_date'])
     df = df.sort_values('trade_date')
     return df
 
 
-def calculate_next_day_performance(limit_up_stocks, date):
-    next_trading_day = get_next_trading_day(date)
+def get_daily_cross_section(trade_date):
+    # 一次取回某个交易日全市场的日线，只保留代码编号和收盘价
+    df = fetch_scheduler.call("tushare", pro.daily, trade_date=trade_date, fields='ts_code,close').drop_duplicates('ts_code')
+    return pd.DataFrame({'symbol_id': symbol_registry.ids(df['ts_code']), 'close': df['close'].to_numpy()})
 
-    results = []
-    for _, row in limit_up_stocks.iterrows():
-        stock_code = row['股票代码']
-        stock_name = row['股票简称']
 
-        df = get_stock_data(stock_code, date, next_trading_day)
+def calculate_next_day_performance(limit_up_stocks, date):
+    next_trading_day = get_next_trading_day(date)
 
-        if len(df) >= 2:
-            limit_up_price = df.iloc[0]['close']
-            next_day_price = df.iloc[1]['close']
-            change_pct = (next_day_price - limit_up_price) / limit_up_price * 100
+    # 涨停日和次日各查一次全市场截面，再与涨停列表做向量化合并，不再逐只股票请求
+    limit_up_close = get_daily_cross_section(date).rename(columns={'close': '涨停价'})
+    next_day_close = get_daily_cross_section(next_trading_day).rename(columns={'close': '次日收盘价'})
 
-            results.append({
-                '股票代码': stock_code,
-                '股票简称': stock_name,
-                '涨停价': limit_up_price,
-                '次日收盘价': next_day_price,
-                '次日涨跌幅': change_pct
-            })
+    # 问财代码和 ts_code 都先规范成 int32 编号，合并在整数键上进行
+    limit_up = limit_up_stocks[['股票代码', '股票简称']].assign(
+        symbol_id=symbol_registry.ids(limit_up_stocks['股票代码']))
+    result = (limit_up
+              .merge(limit_up_close, on='symbol_id', how='inner')
+              .merge(next_day_close, on='symbol_id', how='inner')
+              .drop(columns='symbol_id'))
+    result['次日涨跌幅'] = (result['次日收盘价'] - result['涨停价']) / result['涨停价'] * 100
 
-    return pd.DataFrame(results)
+    return result.reset_index(drop=True)
 
 
 def display_stock_analysis(stock_code, selected_date):
@@ -13,6 +13,7 @@
 
 
 import pandas as pd
+import fetch_scheduler
 
 # Setting up pandas display options
 pd.set_option('display.unicode.ambiguous_as_wide', True)
@@ -34,7 +35,7 @@ date = "20241025"
 try:
     # Try to import akshare, if available
     import akshare as ak
-    df = ak.stock_notice_report(symbol="全部", date=date)
+    df = fetch_scheduler.call("akshare", ak.stock_notice_report, symbol="全部", date=date)
 except ImportError:
     print("akshare not available")
 
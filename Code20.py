@@ -20,7 +20,7 @@
 
 
 import streamlit as st
-import pywencai
+import wencai_cache
 import pandas as pd
 from datetime import datetime, timedelta
 import tushare as ts
@@ -67,7 +67,7 @@ def get_previous_trading_day(date):
 
 def get_limit_up_data(date):
     param = f"{date.strftime('%Y%m%d')}涨停，成交金额排序"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc', loop=True)
+    df = wencai_cache.get(query=param, sort_key='成交金额', sort_order='desc', loop=True)
     selected_columns = ['股票代码', '股票简称', '最新价', '最新涨跌幅', f'首次涨停时间[{date.strftime("%Y%m%d")}]',
                         f'连续涨停天数[{date.strftime("%Y%m%d")}]', f'涨停原因类别[{date.strftime("%Y%m%d")}]',
                         f'a股市值(不含限售股)[{date.strftime("%Y%m%d")}]',
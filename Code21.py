@@ -1,10 +1,10 @@
 
-import pywencai
+import wencai_cache
 
 
 def app():    
   param = f"同花顺概念指数"    
-  df = pywencai.get(query=param,  query_type="zhishu", sort_order='desc', loop=True)   
+  df = wencai_cache.get(query=param,  query_type="zhishu", sort_order='desc', loop=True)   
   print(df)
  
 if __name__ == "__main__":  
@@ -1,15 +1,16 @@
 import streamlit as st
-import pywencai
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime
 import plotly.graph_objects as go
-from chinese_calendar import is_workday, is_holiday
+import trade_calendar
+import wencai_long
+from wencai_long import TRADE_DATE
 
 # 在原来代码基础上增加了 根据连板天数排序， 每支个股的涨停原因分析。  
 # 这个我之前没加， 是因为我很少关注连续涨停股， 毕竟我不是龙头选手。
 # 另外增加了连板晋级率，  比如1进2,2进3  可以分析涨停板晋级概率。对于龙头选手有一定的辅助效果。  
 # 另外交易日判断，我之前肤浅了，主要是脑子短路了。根据读者提醒，
-# 改为引入日历控件chinese_calendar的is_workday, is_holiday  判断工作日、节假日。 
+# 改为用 trade_calendar 的本地交易日历判断交易日和前一交易日。
 
 # Setting up pandas display options
 pd.set_option('display.unicode.ambiguous_as_wide', True)
@@ -21,68 +22,51 @@ pd.set_option('display.max_colwidth', 100)
 
 
 def get_previous_trading_day(date):
-    previous_date = date - timedelta(days=1)
-    while not is_workday(previous_date) or is_holiday(previous_date):
-        previous_date -= timedelta(days=1)
-    return previous_date
+    return trade_calendar.previous_trading_day(date)
 
 
-def get_limit_up_data(date):
-    param = f"{date.strftime('%Y%m%d')}涨停，成交金额排序"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc', loop=True)
-    return df
+def get_limit_up_data(dates):
+    # 多天的问财结果拼成一张长表，字段名固定，日期在 trade_date 列
+    return wencai_long.load_days("{date}涨停，成交金额排序", dates, sort_key='成交金额', sort_order='desc', loop=True)
 
 
-def analyze_continuous_limit_up(df, date):
-    # 提取连续涨停天数列和涨停原因类别列
-    continuous_days_col = f'连续涨停天数[{date.strftime("%Y%m%d")}]'
-    reason_col = f'涨停原因类别[{date.strftime("%Y%m%d")}]'
+def select_day(long, date):
+    return long[long[TRADE_DATE] == pd.Timestamp(date)].reset_index(drop=True)
 
+
+def analyze_continuous_limit_up(df):
     # 确保涨停原因类别列存在
-    if reason_col not in df.columns:
-        df[reason_col] = '未知'
+    if '涨停原因类别' not in df.columns:
+        df = df.assign(涨停原因类别='未知')
 
     # 按连续涨停天数降序排序，然后按涨停原因类别排序
-    df_sorted = df.sort_values([continuous_days_col, reason_col], ascending=[False, True])
-
-    # 创建结果DataFrame
-    result = pd.DataFrame(columns=['连续涨停天数', '股票代码', '股票简称', '涨停原因类别'])
-
-    # 遍历排序后的DataFrame，为每只股票创建一行
-    for _, row in df_sorted.iterrows():
-        new_row = pd.DataFrame({
-            '连续涨停天数': [row[continuous_days_col]],
-            '股票代码': [row['股票代码']],
-            '股票简称': [row['股票简称']],
-            '涨停原因类别': [row[reason_col]]
-        })
-        result = pd.concat([result, new_row], ignore_index=True)
+    df_sorted = df.sort_values(['连续涨停天数', '涨停原因类别'], ascending=[False, True])
+    return df_sorted[['连续涨停天数', '股票代码', '股票简称', '涨停原因类别']].reset_index(drop=True)
 
-    return result
 
+def get_concept_counts(long):
+    """所有日期的概念出现次数一次算完：行为概念，列为交易日"""
+    concepts = long[[TRADE_DATE]].assign(概念=long['涨停原因类别'].astype(object).str.split('+')).explode('概念')
+    return concepts.groupby(['概念', TRADE_DATE]).size().unstack(TRADE_DATE, fill_value=0)
 
-def get_concept_counts(df, date):
-    concepts = df[f'涨停原因类别[{date.strftime("%Y%m%d")}]'].str.split('+').explode().reset_index(drop=True)
-    concept_counts = concepts.value_counts().reset_index()
-    concept_counts.columns = ['概念', '出现次数']
-    return concept_counts
 
-
-def calculate_promotion_rates(current_df, previous_df, current_date, previous_date):
+def calculate_promotion_rates(long, current_date, previous_date):
     """Calculate promotion rates between consecutive days"""
-    current_days_col = f'连续涨停天数[{current_date.strftime("%Y%m%d")}]'
-    previous_days_col = f'连续涨停天数[{previous_date.strftime("%Y%m%d")}]'
+    current_date, previous_date = pd.Timestamp(current_date), pd.Timestamp(previous_date)
+    # 两天各连板高度的家数，一次 groupby 得到
+    levels = long.groupby([TRADE_DATE, '连续涨停天数']).size()
+    current_df = select_day(long, current_date)
 
     promotion_data = []
 
     # Calculate for each level (from 1 to max consecutive days)
-    max_days = max(current_df[current_days_col].max(), previous_df[previous_days_col].max())
+    max_days = long['连续涨停天数'].max() if not long.empty else 0
 
     for days in range(1, int(max_days)):
         # Previous day count for current level
-        prev_count = len(previous_df[previous_df[previous_days_col] == days])
+        prev_count = int(levels.get((previous_date, days), 0))
         # Current day count for next level
-        curr_count = len(current_df[current_df[current_days_col] == days + 1])
+        curr_count = int(levels.get((current_date, days + 1), 0))
 
         if prev_count > 0:
             promotion_rate = f"{curr_count}/{prev_count}={round(curr_count / prev_count * 100 if prev_count > 0 else 0)}%"
@@ -90,8 +74,7 @@ def calculate_promotion_rates(current_df, previous_df, current_date, previous_da
             promotion_rate = "N/A"
 
         # Get stocks that promoted
-        promoted_stocks = current_df[current_df[current_days_col] == days + 1][
-            ['股票简称', f'涨停原因类别[{current_date.strftime("%Y%m%d")}]']]
+        promoted_stocks = current_df[current_df['连续涨停天数'] == days + 1][['股票简称', '涨停原因类别']]
 
         promotion_data.append({
             '连板数': f"{days}板{days + 1}",
@@ -108,7 +91,7 @@ def app():
     max_date = datetime.now().date()
     selected_date = st.date_input("选择分析日期", max_value=max_date, value=max_date)
 
-    if not is_workday(selected_date) or is_holiday(selected_date):
+    if not trade_calendar.is_trading_day(selected_date):
         st.write("所选日期不是A股交易日，请选择其他日期。")
         return
 
@@ -117,21 +100,22 @@ def app():
     st.write(f"分析日期: {selected_date} 和 {previous_date} (前一交易日)")
 
     # Fetch data for both days
-    selected_df = get_limit_up_data(selected_date)
-    previous_df = get_limit_up_data(previous_date)
+    limit_up_long = get_limit_up_data([previous_date, selected_date])
+    selected_df = select_day(limit_up_long, selected_date)
+    previous_df = select_day(limit_up_long, previous_date)
 
     # Analyze continuous limit-up for both days
-    selected_continuous = analyze_continuous_limit_up(selected_df, selected_date)
-    previous_continuous = analyze_continuous_limit_up(previous_df, previous_date)
+    selected_continuous = analyze_continuous_limit_up(selected_df)
+    previous_continuous = analyze_continuous_limit_up(previous_df)
 
     # Get concept counts for both days
-    selected_concepts = get_concept_counts(selected_df, selected_date)
-    previous_concepts = get_concept_counts(previous_df, previous_date)
-
-    # Merge concept counts
-    merged_concepts = pd.merge(selected_concepts, previous_concepts, on='概念', how='outer',
-                               suffixes=('_selected', '_previous'))
-    merged_concepts = merged_concepts.fillna(0)
+    concept_counts = get_concept_counts(limit_up_long).reindex(
+        columns=[pd.Timestamp(selected_date), pd.Timestamp(previous_date)], fill_value=0)
+    merged_concepts = pd.DataFrame({
+        '概念': concept_counts.index,
+        '出现次数_selected': concept_counts.iloc[:, 0].to_numpy(),
+        '出现次数_previous': concept_counts.iloc[:, 1].to_numpy(),
+    })
 
     # Calculate change
     merged_concepts['变化'] = merged_concepts['出现次数_selected'] - merged_concepts['出现次数_previous']
@@ -190,7 +174,7 @@ def app():
     st.dataframe(selected_df)
 
     st.subheader("连板晋级率分析")
-    promotion_rates = calculate_promotion_rates(selected_df, previous_df, selected_date, previous_date)
+    promotion_rates = calculate_promotion_rates(limit_up_long, selected_date, previous_date)
 
     # Display promotion rates in a custom format
     for _, row in promotion_rates.iterrows():
@@ -202,7 +186,7 @@ def app():
         with col2:
             if not row['股票列表'].empty:
                 for _, stock in row['股票列表'].iterrows():
-                    concept = stock[f'涨停原因类别[{selected_date.strftime("%Y%m%d")}]']
+                    concept = stock['涨停原因类别']
                     st.write(f"{stock['股票简称']} ({concept})")
 
         st.markdown("---")
@@ -14,15 +14,8 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
-import pywencai
-
-
-def safe_float(value):
-    """Safely convert a value to float, returning 0 if conversion fails"""
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return 0.0
+import wencai_cache
+from frame_schema import normalize_wencai
 
 
 # Page config
@@ -36,8 +29,8 @@ def get_market_data(date):
         date_str = date.strftime("%Y%m%d")
         limit_up_query = f"{date}涨停，成交金额排序"
         limit_down_query = f"{date}跌停，成交金额排序"
-        limit_up_df = pywencai.get(query=limit_up_query, sort_key='成交额', sort_order='desc',  loop=True)
-        limit_down_df = pywencai.get(query=limit_down_query, sort_key='成交额', sort_order='desc', loop=True)
+        limit_up_df = normalize_wencai(wencai_cache.get(query=limit_up_query, sort_key='成交额', sort_order='desc',  loop=True))
+        limit_down_df = normalize_wencai(wencai_cache.get(query=limit_down_query, sort_key='成交额', sort_order='desc', loop=True))
         return limit_up_df, limit_down_df
     except Exception as e:
         st.error(f"获取数据失败: {e}")
@@ -55,10 +48,10 @@ def calculate_metrics(limit_up_df, limit_down_df, date):
         "跌停数量": len(limit_down_df),
         "涨停比": f"{len(limit_up_df)}:{len(limit_down_df)}",
         "封板率": round(
-            len(limit_up_df[limit_up_df[f'最新涨跌幅'].apply(safe_float) >= 9.9]) / len(limit_up_df) * 100,
+            len(limit_up_df[limit_up_df['最新涨跌幅'] >= 9.9]) / len(limit_up_df) * 100,
             2) if len(limit_up_df) > 0 else 0,
         "连板率": round(
-            len(limit_up_df[limit_up_df[f'连续涨停天数[{date_str}]'].apply(safe_float) > 1]) / len(limit_up_df) * 100,
+            len(limit_up_df[limit_up_df[f'连续涨停天数[{date_str}]'] > 1]) / len(limit_up_df) * 100,
             2) if len(limit_up_df) > 0 else 0,
     }
     return metrics
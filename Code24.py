@@ -18,12 +18,13 @@
 
 import streamlit as st
 import akshare as ak
+import fetch_scheduler
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 def fetch_stock_data(stock_code, start_date, end_date):
     # 获取股票历史数据
-    stock_data = ak.stock_zh_a_daily(symbol=stock_code, start_date=start_date, end_date=end_date)
+    stock_data = fetch_scheduler.call("akshare", ak.stock_zh_a_daily, symbol=stock_code, start_date=start_date, end_date=end_date)
     stock_data.reset_index(inplace=True)  # 重置索引
     stock_data['date'] = pd.to_datetime(stock_data['date'])  # 转换日期格式
     stock_data.set_index('date', inplace=True)  # 将日期设置为索引
@@ -5,6 +5,7 @@
 
 import streamlit as st
 import akshare as ak
+import fetch_scheduler
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
@@ -80,9 +81,9 @@ def main():
                 start_date = end_date - timedelta(days=90)  # 获取最近3个月的数据
 
                 if stock_code.startswith('sh') or stock_code.startswith('sz'):
-                    df = ak.stock_zh_index_daily(symbol=stock_code)
+                    df = fetch_scheduler.call("akshare", ak.stock_zh_index_daily, symbol=stock_code)
                 else:
-                    df = ak.stock_zh_a_daily(symbol=stock_code)
+                    df = fetch_scheduler.call("akshare", ak.stock_zh_a_daily, symbol=stock_code)
 
             # 重命名列
             df = df.rename(columns={
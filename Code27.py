@@ -1,5 +1,5 @@
 import streamlit as st
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
@@ -34,8 +34,7 @@ rsi_period = st.slider('RSI 周期', min_value=1, max_value=30, value=14)
 @st.cache_data
 def fetch_stock_data(stock_code):
     try:
-        df = ak.stock_zh_a_hist(symbol=stock_code, period="daily", start_date="20241008", end_date="20250107",
-                                adjust="")
+        df = get_stock_hist(symbol=stock_code, start_date="20241008", end_date="20250107", adjust="")
         df['date'] = pd.to_datetime(df['日期'])
         df = df.rename(columns={'收盘': 'close', '开盘': 'open', '最高': 'high', '最低': 'low'})
         df = df.set_index('date')
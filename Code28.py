@@ -1,5 +1,5 @@
 import streamlit as st
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import plotly.graph_objects as go
 
@@ -42,10 +42,10 @@ def main():
     num_std = st.slider("标准差倍数", min_value=1, max_value=4, value=2)
 
     if st.button("分析"):
-        # 使用AKShare获取股票数据
+        # 从本地日线仓库获取股票数据
         try:
-            stock_data = ak.stock_zh_a_hist(symbol=stock_code, start_date=start_date.strftime("%Y%m%d"),
-                                            end_date=end_date.strftime("%Y%m%d"), adjust="qfq")
+            stock_data = get_stock_hist(symbol=stock_code, start_date=start_date.strftime("%Y%m%d"),
+                                        end_date=end_date.strftime("%Y%m%d"), adjust="qfq")
 
             # 检查并显示列名
             #st.write("数据列名:", stock_data.columns.tolist())
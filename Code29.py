@@ -1,5 +1,5 @@
 import streamlit as st
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -15,8 +15,8 @@ stock_code = st.text_input("请输入股票代码", "002878")
 @st.cache_data
 def get_stock_data(code):
     try:
-        # 使用 akshare 获取股票数据
-        df = ak.stock_zh_a_hist(symbol=code, period="daily", start_date="20241008", end_date="20250109", adjust="")
+        # 从本地日线仓库获取股票数据
+        df = get_stock_hist(symbol=code, start_date="20241008", end_date="20250109", adjust="")
         # 确保日期列被正确解析
         df['日期'] = pd.to_datetime(df['日期'])
         return df
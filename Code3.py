@@ -1,7 +1,7 @@
 
 from datetime import datetime
 import matplotlib.pyplot as plt
-import akshare as ak  # 升级到最新版
+from bar_store import get_stock_hist
 import pandas as pd
 import mplfinance as mpf
 
@@ -13,8 +13,9 @@ plt.rcParams["font.sans-serif"] = ["STHeiti"]
 plt.rcParams["axes.unicode_minus"] = False
 
 def kline(symbol, start_time, end_time, stock_name):
-    # 利用 AKShare 获取股票的后复权数据，这里只获取前 6 列
-    stock_hfq_df = ak.stock_zh_a_hist(symbol, adjust="hfq").iloc[:, :6]
+    # 从本地日线仓库读取后复权数据（仓库会增量同步 AKShare），这里只取 6 列
+    stock_hfq_df = get_stock_hist(symbol, start_time, end_time, adjust="hfq",
+                                  columns=['日期', '开盘', '收盘', '最高', '最低', '成交量'])
 
     # 处理字段命名
     stock_hfq_df.columns = [
@@ -1,18 +1,20 @@
 import streamlit as st
-import akshare as ak
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import snapshot_cache
 
 def fetch_market_data():
     try:
-        # 使用AKShare获取A股市场现货数据
-        stock_zh_a_spot_df = ak.stock_zh_a_spot_em()
+        # 使用AKShare获取A股市场现货数据：新鲜期内直接用缓存，稍旧的先展示、后台刷新，各会话共用同一份
+        snapshot = snapshot_cache.spot_em()
+        # 缓存里的表各会话共用，后面会加列，先复制一份
+        stock_zh_a_spot_df = snapshot.value.copy()
 
-        return stock_zh_a_spot_df
+        return stock_zh_a_spot_df, snapshot.age
     except Exception as e:
         st.error(f"获取数据失败: {e}")
-        return None, None, None
+        return None, None
 
 def calculate_market_overview(df):
     total_stocks = len(df)
@@ -26,7 +28,7 @@ def calculate_market_overview(df):
         '下跌家数': down_stocks,
         '平盘家数': flat_stocks,
         '涨跌比': round(up_stocks / (down_stocks + 1e-5), 2),  # 防止除以零
-        '平均涨跌幅': round(df['涨跌幅'].mean(), 2)
+        '平均涨跌幅': round(float(df['涨跌幅'].mean()), 2)
     }
     return overview
 
@@ -59,9 +61,11 @@ def app():
     st.title("A股市场概况")
 
     with st.spinner("正在获取数据..."):
-        stock_zh_a_spot_df = fetch_market_data()
+        stock_zh_a_spot_df, snapshot_age = fetch_market_data()
 
     if stock_zh_a_spot_df is not None:
+        st.caption(f"行情快照更新于 {snapshot_age:.0f} 秒前")
+
         # 计算市场概览
         overview = calculate_market_overview(stock_zh_a_spot_df)
 
@@ -1,9 +1,10 @@
 import streamlit as st
 from datetime import datetime, timedelta
-import pywencai
+import wencai_cache
 import time
-from chinese_calendar import is_workday, is_holiday
+import trade_calendar
 import plotly.graph_objects as go
+from frame_schema import normalize_wencai
 
 # Constants
 MAX_STOCKS = 20
@@ -19,7 +20,7 @@ def safe_format(x, divisor=1, suffix=''):
 def get_strategy_stocks(query, selected_date, max_retries=MAX_RETRIES):
     for attempt in range(max_retries):
         try:
-            df = pywencai.get(query=query, sort_key='竞价成交金额', sort_order='desc')
+            df = wencai_cache.get(query=query, sort_key='竞价成交金额', sort_order='desc')
             if df is None or df.empty:
                 if attempt < max_retries - 1:
                     time.sleep(RETRY_DELAY)
@@ -40,7 +41,7 @@ def get_strategy_stocks(query, selected_date, max_retries=MAX_RETRIES):
                 f'竞价未匹配金额[{date_str}]': '竞价未匹配金额',
                 f'总市值[{date_str}]': '总市值'
             }
-            df = df.rename(columns=columns_to_rename)
+            df = normalize_wencai(df).rename(columns=columns_to_rename)
             return df[:MAX_STOCKS], None
         except Exception as e:
             if attempt < max_retries - 1:
@@ -52,7 +53,7 @@ def run_strategy(query, selected_date, market_cap):
     st.write(f"选股日期: {selected_date.strftime('%Y-%m-%d')}")
     st.write(f"市值筛选: {market_cap}亿")
 
-    if not is_workday(selected_date) or is_holiday(selected_date):
+    if not trade_calendar.is_trading_day(selected_date):
         st.warning("所选日期不是A股交易日，请选择其他日期。")
         return
 
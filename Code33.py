@@ -1,11 +1,15 @@
 import streamlit as st
 from datetime import datetime, timedelta
-import pywencai
+import wencai_cache
 import pandas as pd
 import plotly.graph_objects as go
-import pandas_market_calendars as mcal
+import trade_calendar
+from concurrent_fetch import fetch_by_date, timing_summary
 from contextlib import contextmanager
 
+# 并发查询的线程数，问财限流较严，不宜设置过大
+MAX_WORKERS = 4
+
 # 设置页面配置
 st.set_page_config(layout="wide", page_title="涨停股最高板分析")
 
@@ -25,32 +29,38 @@ with st_spinner("正在获取和处理数据，请稍候..."):
     end_date = datetime.now()
     dates = [(end_date - timedelta(days=x)).strftime('%Y%m%d') for x in range(20)]
 
-    # 获取中国的交易日历
-    nyse = mcal.get_calendar('XSHG')
-    trading_schedule = nyse.schedule(start_date=min(dates), end_date=max(dates))
-    trading_days = trading_schedule.index.strftime('%Y%m%d').tolist()
+    # 获取中国的交易日历（本地缓存）
+    trading_days = [d.strftime('%Y%m%d') for d in trade_calendar.trading_days_between(min(dates), max(dates))]
 
     # 存储结果的列表
     results = []
 
-    # 循环获取每个日期的数据，仅在交易日执行
-    for date in dates:
-        if date in trading_days:
-            query = f"非ST，{date}连续涨停天数排序，涨停原因"
-            try:
-                data = pywencai.get(query=query)
-                if not data.empty:
-                    # 提取第一条记录（最高涨停股）
-                    first_row = data.iloc[0]
-                    results.append({
-                        '日期': datetime.strptime(date, '%Y%m%d'),  # 转换为datetime对象
-                        '股票简称': first_row['股票简称'],
-                        '股票代码': first_row['股票代码'],
-                        '连续涨停天数': first_row[f'连续涨停天数[{date}]'],
-                        '涨停原因': first_row[f'涨停原因类别[{date}]']
-                    })
-            except Exception as e:
-                st.error(f"查询 {date} 数据时出错: {e}")
+    def fetch_top_board(date):
+        data = wencai_cache.get(query=f"非ST，{date}连续涨停天数排序，涨停原因")
+        if data is None or data.empty:
+            return None
+        # 提取第一条记录（最高涨停股）
+        first_row = data.iloc[0]
+        return {
+            '日期': datetime.strptime(date, '%Y%m%d'),  # 转换为datetime对象
+            '股票简称': first_row['股票简称'],
+            '股票代码': first_row['股票代码'],
+            '连续涨停天数': first_row[f'连续涨停天数[{date}]'],
+            '涨停原因': first_row[f'涨停原因类别[{date}]']
+        }
+
+    # 仅在交易日查询，各日期并发执行，结果仍按日期顺序返回
+    query_dates = [date for date in dates if date in trading_days]
+    date_results = fetch_by_date(query_dates, fetch_top_board, max_workers=MAX_WORKERS)
+
+    for date, row, error, elapsed in date_results:
+        if error is not None:
+            st.error(f"查询 {date} 数据时出错: {error}")
+        elif row is not None:
+            results.append(row)
+
+    with st.expander("各日期查询耗时"):
+        st.dataframe(timing_summary(date_results))
 
     # 检查是否有数据
     if results:
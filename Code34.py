@@ -1,5 +1,6 @@
 import streamlit as st
 import akshare as ak
+import fetch_scheduler
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
@@ -8,7 +9,7 @@ from plotly.subplots import make_subplots
 
 def fetch_stock_data(stock_code, start_date, end_date):
     try:
-        stock_data = ak.stock_zh_a_daily(symbol=stock_code, start_date=start_date, end_date=end_date)
+        stock_data = fetch_scheduler.call("akshare", ak.stock_zh_a_daily, symbol=stock_code, start_date=start_date, end_date=end_date)
         stock_data.reset_index(inplace=True)
         stock_data['date'] = pd.to_datetime(stock_data['date'])
         stock_data.set_index('date', inplace=True)
@@ -1,4 +1,5 @@
 import akshare as ak
+import fetch_scheduler
 import pandas as pd
 
 # 前不久写过一篇文章【python技术】使用akshare抓取东方财富所有概念板块，
@@ -15,7 +16,7 @@ def fetch_and_save_concept_stocks(name):
     :param name: 股票概念名称
     """
     # 获取所有股票概念及其成分股信息
-    concept_stocks_df = ak.stock_board_concept_name_em()
+    concept_stocks_df = fetch_scheduler.call("akshare", ak.stock_board_concept_name_em)
     spath = f"./概念板块.xlsx"
     concept_stocks_df.to_excel(spath, index=False)
 
@@ -25,7 +26,7 @@ def fetch_and_save_concept_stocks(name):
         return
 
     # 筛选出指定概念的成分股
-    df = ak.stock_board_concept_cons_em(name)
+    df = fetch_scheduler.call("akshare", ak.stock_board_concept_cons_em, name)
 
     # 保存至Excel文件
     spath = f"./{name}.xlsx"
@@ -1,5 +1,6 @@
 
 import akshare as ak
+import fetch_scheduler
 import xlsxwriter
 import pandas as pd
 
@@ -12,7 +13,7 @@ pd.set_option('display.width', None)  # 自动检测控制台的宽度
 pd.set_option('display.max_colwidth', 50)  # 设置列的最大宽度为50
 
 date ="20240509"
-df = ak.stock_zt_pool_em(date)
+df = fetch_scheduler.call("akshare", ak.stock_zt_pool_em, date)
 df['流通市值'] = round(df['流通市值']/100000000)
 df['换手率']=round(df['换手率'])
 spath = f"./{date}涨停.xlsx"
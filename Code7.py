@@ -1,8 +1,9 @@
 
 
-import pywencai
+import wencai_cache
 import xlsxwriter
 import pandas as pd
+from frame_schema import normalize_wencai
 
 # 最近A股市场不好，今天又是3000多只待涨， 市场一片哀鸿遍野。
 # 打开同花顺问财看了一眼，顿时索然无味。 原本没什么灵感， 
@@ -36,7 +37,7 @@ pd.set_option('display.max_colwidth', 100)
 
 date ="20240821"
 param = "{date}涨停，非涉嫌信息披露违规且非立案调查且非ST，非科创板，非北交所"
-df = pywencai.get(query= param ,sort_key='成交金额', sort_order='desc')
+df = normalize_wencai(wencai_cache.get(query= param ,sort_key='成交金额', sort_order='desc'))
 
 
 spath = f"./{date}涨停wencai.xlsx"
@@ -1,5 +1,5 @@
 
-import pywencai
+import wencai_cache
 import xlsxwriter
 import pandas as pd
 
@@ -26,7 +26,7 @@ pd.set_option('display.max_colwidth', 100)
 
 date ="20240823"
 param = "{date}涨停，非涉嫌信息披露违规且非立案调查且非ST，非科创板，非北交所"
-df = pywencai.get(query= param ,sort_key='成交金额', sort_order='desc')
+df = wencai_cache.get(query= param ,sort_key='成交金额', sort_order='desc')
 
 
 spath = f"./{date}涨停wencai.xlsx"
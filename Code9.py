@@ -1,12 +1,13 @@
-import akshare as ak
+from bar_store import get_stock_hist
 import pandas as pd
 from pyecharts import options as opts
 from pyecharts.charts import Kline, Line, Bar, Grid
 
 
 def fetch_stock_data(symbol, start_time, end_time,stock_name):
-    # 利用 AKShare 获取股票的数据，这里只获取前 6 列
-    stock_hfq_df = ak.stock_zh_a_hist(symbol, adjust="").iloc[:, :6]
+    # 从本地日线仓库读取不复权数据（仓库会增量同步 AKShare），这里只取 6 列
+    stock_hfq_df = get_stock_hist(symbol, start_time, end_time, adjust="",
+                                  columns=['日期', '开盘', '收盘', '最高', '最低', '成交量'])
 
     # 处理字段命名
     stock_hfq_df.columns = [
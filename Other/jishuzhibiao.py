@@ -1,5 +1,6 @@
+import os
+import sys
 import streamlit as st
-import akshare as ak
 import pandas as pd
 import numpy as np
 import talib
@@ -7,6 +8,11 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 
+# 本地日线仓库在仓库根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bar_store import get_stock_hist
+from bar_resample import period_start, resample_bars
+
 # 全局设置
 CHINESE_FONT = {'family': 'SimHei', 'size': 14}
 PERIOD_MAP = {"日线": "daily", "周线": "weekly", "月线": "monthly"}
@@ -35,13 +41,10 @@ with st.sidebar:
 # 缓存数据获取
 def get_stock_data(_symbol, start, end, period_type):
     try:
-        df = ak.stock_zh_a_hist(
-            symbol=_symbol,
-            period=period_type,
-            start_date=start.strftime("%Y%m%d"),
-            end_date=end.strftime("%Y%m%d"),
-            adjust="qfq"
-        )
+        # 日线走本地仓库，只增量同步新K线；周线、月线由本地日线合成，切换周期不再请求网络
+        df = get_stock_hist(_symbol, period_start(start, period_type).strftime("%Y%m%d"),
+                            end.strftime("%Y%m%d"), adjust="qfq")
+        df = resample_bars(df, period_type)
         if df.empty:
             return pd.DataFrame()
         df['日期'] = pd.to_datetime(df['日期'])
@@ -1,10 +1,15 @@
-import akshare as ak
+import os
+import sys
 import streamlit as st
 import plotly.graph_objects as go
 import talib
 import pandas as pd
 from datetime import datetime
 
+# 本地日线仓库在仓库根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bar_store import get_stock_hist
+
 st.set_page_config(page_title="A股K线形态识别", layout="wide")
 st.title("A股K线形态识别")
 
@@ -20,11 +25,11 @@ def get_stock_data(symbol, start, end):
     """获取A股前复权数据"""
     try:
         code = f"{symbol}"
-        df = ak.stock_zh_a_hist(
-            symbol=code, period="daily",
+        df = get_stock_hist(
+            symbol=code,
             start_date=start.strftime("%Y%m%d"),
             end_date=end.strftime("%Y%m%d"),
-             adjust="qfq"
+            adjust="qfq"
         )
         df = df.rename(columns={
             '日期': 'date', '开盘': 'open', '收盘': 'close',
@@ -1,10 +1,15 @@
 # 涨停分析
 import streamlit as st
-import pywencai
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import akshare as ak
+import os
+import sys
+
+# 交易日历、问财请求计划模块在仓库根目录
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import trade_calendar
+from fetch_plan import FetchPlan
 
 # Setting up pandas display options
 pd.set_option('display.unicode.ambiguous_as_wide', True)
@@ -14,34 +19,40 @@ pd.set_option('display.max_columns', None)
 pd.set_option('display.expand_frame_repr', False)
 pd.set_option('display.max_colwidth', 100)
 
-def get_limit_up_data(date):
-    param = f"非ST,{date.strftime('%Y%m%d')}涨停"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc', loop=True, cookie = '')
-    print(df)
-    return df
+# 本页所有问财查询共用的参数
+WENCAI_PARAMS = dict(sort_key='成交金额', sort_order='desc', loop=True)
+
+def limit_up_query(date):
+    return f"非ST,{date.strftime('%Y%m%d')}涨停"
 
-def get_yesterday_zhangting_data(previous_date , date):
-    param = f"非ST,{previous_date.strftime('%Y%m%d')}涨停"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc', loop=True)
-    return df
+def poban_query(date):
+    return f"非ST,{date.strftime('%Y%m%d')}曾涨停"
 
-def get_poban(date):
-    param = f"非ST,{date.strftime('%Y%m%d')}曾涨停"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc', loop=True)
-    return df
+def limit_down_query(date):
+    return f"非ST,{date.strftime('%Y%m%d')}跌停"
 
-def get_limit_down_data(date):
-    param = f"非ST,{date.strftime('%Y%m%d')}跌停"
-    df = pywencai.get(query=param, sort_key='成交金额', sort_order='desc', loop=True)
-    return df
+def fetch_page_data(selected_date, previous_date):
+    """声明本页需要的全部数据，由计划器合并相同请求后并发拉取"""
+    plan = FetchPlan()
+    plan.add('selected', limit_up_query(selected_date), **WENCAI_PARAMS)  # 今日涨停
+    plan.add('previous', limit_up_query(previous_date), **WENCAI_PARAMS)  # 昨日涨停
+    plan.add('yesterday_zhangting', limit_up_query(previous_date), **WENCAI_PARAMS)  # 昨日涨停股票，与上一条相同
+    plan.add('poban', poban_query(selected_date), **WENCAI_PARAMS)  # 今日曾涨停
+    plan.add('selected_limit_down', limit_down_query(selected_date), **WENCAI_PARAMS)
+    plan.add('previous_limit_down', limit_down_query(previous_date), **WENCAI_PARAMS)
+    return plan.run(), plan.errors
 
 def analyze_continuous_limit_up(df, date):
     # 提取连续涨停天数列和涨停原因类别列
     continuous_days_col = f'连续涨停天数[{date.strftime("%Y%m%d")}]'
     reason_col = f'涨停原因类别[{date.strftime("%Y%m%d")}]'
 
-    # 确保涨停原因类别列存在
+    if df.empty:
+        return pd.DataFrame(columns=["连续涨停天数", "股票代码", "股票简称", "涨停原因类别"])
+
+    # 确保涨停原因类别列存在；df 是计划器里共用的DataFrame，补列前先复制
     if reason_col not in df.columns:
+        df = df.copy()
         df[reason_col] = '未知'
 
     # 按连续涨停天数降序排序，然后按涨停原因类别排序
@@ -62,6 +73,8 @@ def analyze_continuous_limit_up(df, date):
     return result
 
 def get_concept_counts(df, date):
+    if df.empty:
+        return pd.DataFrame(columns=['概念', '出现次数'])
     concepts = df[f'涨停原因类别[{date.strftime("%Y%m%d")}]'].str.split('+').explode().reset_index(drop=True)
     #concepts = df[f'涨停原因类别[{date.strftime("%Y%m%d")}]'].str.split('+', n=1).str[0].reset_index(drop=True)
     concept_counts = concepts.value_counts().reset_index()
@@ -154,28 +167,24 @@ def app():
     max_date = datetime.now().date()
     selected_date = st.date_input("选择分析日期", max_value=max_date, value=max_date)
     
-    trade_date_range = ak.tool_trade_date_hist_sina()
-    trade_date_range['trade_date'] = pd.to_datetime(trade_date_range['trade_date']).dt.date
-    
-    if selected_date not in trade_date_range['trade_date'].values:
+    if not trade_calendar.is_trading_day(selected_date):
         st.write("所选日期不是A股交易日，请选择其他日期。")
         return
-    target_date = selected_date
-    previous_dates = trade_date_range[trade_date_range['trade_date'] < target_date]
-    
-    if previous_dates.empty:
-        raise ValueError("No previous trading day found before the given date")
     
     # 获取最近的交易日
-    previous_date = previous_dates['trade_date'].max()
+    previous_date = trade_calendar.previous_trading_day(selected_date)
     
     st.write(f"分析日期: {selected_date} 和 {previous_date} (前一交易日)")
     
-    # 获取关键数据
-    selected_df = get_limit_up_data(selected_date) # 今日涨停
-    previous_df = get_limit_up_data(previous_date) # 昨日涨停
-    poban_df = get_poban(selected_date) # 今日曾涨停
-    yesterdayZhangting = get_yesterday_zhangting_data(previous_date, selected_date) # 昨日涨停股票
+    # 获取关键数据（一次声明，相同查询只请求一次）
+    page_data, errors = fetch_page_data(selected_date, previous_date)
+    # 个别查询失败时只提示，其余面板照常显示
+    for name, error in errors.items():
+        st.warning(f"数据 {name} 获取失败：{error}")
+    selected_df = page_data['selected'] # 今日涨停
+    previous_df = page_data['previous'] # 昨日涨停
+    poban_df = page_data['poban'] # 今日曾涨停
+    yesterdayZhangting = page_data['yesterday_zhangting'] # 昨日涨停股票
     
     # 计算关键指标 ----------------------------------------------------------
     # 昨日涨停股票列表
@@ -195,17 +204,14 @@ def app():
     poban_denominator = len(poban_stocks) + len(today_zt_stocks)
     poban_rate = (poban_molecule / poban_denominator * 100) if poban_denominator > 0 else 0
     
-    # 昨日涨停今日涨幅（获取实际涨幅数据）
-    yesterday_today_pct = get_yesterday_zhangting_data(previous_date,selected_date)
-    
-    # 计算上涨比例
-    yesterday_today_pct['最新涨跌幅'] = pd.to_numeric(yesterday_today_pct['最新涨跌幅'], errors='coerce')
+    # 昨日涨停今日涨幅（与昨日涨停是同一份数据，不原地修改共享的DataFrame）
+    yesterday_today_pct = pd.to_numeric(yesterdayZhangting.get('最新涨跌幅', pd.Series(dtype=float)), errors='coerce')
     
     # Calculate up_count, ignoring NaN values
-    up_count = np.sum(yesterday_today_pct['最新涨跌幅'] > 0)
+    up_count = np.sum(yesterday_today_pct > 0)
     
     # Calculate total_count, excluding NaN values
-    total_count = yesterday_today_pct['最新涨跌幅'].count()
+    total_count = yesterday_today_pct.count()
     
     # Calculate up_rate
     up_rate = (up_count / total_count * 100) if total_count > 0 else 0
@@ -235,12 +241,9 @@ def app():
         help="今日曾触及涨停但收盘未封板的比例"
     )
     
-    # Fetch data for both days
-    selected_df = get_limit_up_data(selected_date)
-    previous_df = get_limit_up_data(previous_date)
-
-    selected_limit_down_df = get_limit_down_data(selected_date)
-    previous_limit_down_df = get_limit_down_data(previous_date)
+    # 跌停数据同样来自计划器，上面的涨停数据直接复用
+    selected_limit_down_df = page_data['selected_limit_down']
+    previous_limit_down_df = page_data['previous_limit_down']
     
     # Analyze continuous limit-up for both days
     selected_continuous = analyze_continuous_limit_up(selected_df, selected_date)
@@ -0,0 +1,172 @@
+# 报警规则
+# 报警条件写成基于快照列和指标列的表达式，例如 "price < ma5"、"pct_change < -3"、"volume_ratio > 2"，
+# 也支持 and / or / not、四则运算和连续比较，例如 "pct_change > 3 and volume_ratio > 2"。
+# 每轮检查时，所有规则对所有股票都用NumPy数组运算一次算完，只返回触发的 (股票, 规则) 列表。
+#
+# “列 比较符 常数” 这类最常见的规则会按 (列, 比较符) 分组，一组规则与整列做一次广播比较，
+# 上千条规则 × 上千只股票也只需要几毫秒。
+
+import ast
+import operator
+from collections import defaultdict
+
+import numpy as np
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+
+def _constant(node):
+    """数字常数（含负数），不是常数时返回 None"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return float(node.value)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        value = _constant(node.operand)
+        return None if value is None else -value
+    return None
+
+
+def _compile(node, names):
+    """把表达式语法树编译成 f(columns) -> 数组 的函数，同时收集用到的列名"""
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, names)
+
+    value = _constant(node)
+    if value is not None:
+        return lambda columns: value
+
+    if isinstance(node, ast.Name):
+        names.add(node.id)
+        return lambda columns: columns[node.id]
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(v, names) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def bool_op(columns):
+            result = parts[0](columns)
+            for part in parts[1:]:
+                result = combine(result, part(columns))
+            return result
+        return bool_op
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile(node.operand, names)
+        return lambda columns: np.logical_not(operand(columns))
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        operand = _compile(node.operand, names)
+        return lambda columns: -operand(columns)
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left, right = _compile(node.left, names), _compile(node.right, names)
+        op = _BINARY_OPS[type(node.op)]
+        return lambda columns: op(left(columns), right(columns))
+
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPS for op in node.ops):
+        operands = [_compile(node.left, names)] + [_compile(c, names) for c in node.comparators]
+        ops = [_COMPARE_OPS[type(op)] for op in node.ops]
+
+        def compare(columns):
+            values = [operand(columns) for operand in operands]
+            result = ops[0](values[0], values[1])
+            for i in range(1, len(ops)):
+                result = np.logical_and(result, ops[i](values[i], values[i + 1]))
+            return result
+        return compare
+
+    raise ValueError(f"报警规则不支持的写法: {ast.dump(node)}")
+
+
+def _simple_comparison(tree):
+    """识别 “列 比较符 常数” 形式，返回 (列名, 比较符类型, 常数)，否则返回 None"""
+    body = tree.body
+    if isinstance(body, ast.Compare) and len(body.ops) == 1 and type(body.ops[0]) in _COMPARE_OPS \
+            and isinstance(body.left, ast.Name):
+        value = _constant(body.comparators[0])
+        if value is not None:
+            return body.left.id, type(body.ops[0]), value
+    return None
+
+
+class RuleSet:
+    def __init__(self, rules, available=None):
+        """rules 为 {规则名: 表达式}；给出 available（可用列名）时，写错或用到不存在列的规则
+        在这里就被剔除并记入 rejected，不会在每轮检查时拖垮其他规则"""
+        self.names = []
+        self.columns = set()
+        # 规则名 -> 被剔除的原因
+        self.rejected = {}
+        # (列名, 比较符) -> ([规则序号], [阈值])
+        self._grouped = defaultdict(lambda: ([], []))
+        # [(规则序号, 编译后的函数)]
+        self._general = []
+
+        for name, expression in rules.items():
+            try:
+                tree = ast.parse(expression, mode='eval')
+                simple = _simple_comparison(tree)
+                used = set()
+                func = None
+                if simple is not None:
+                    used.add(simple[0])
+                else:
+                    func = _compile(tree, used)
+            except (SyntaxError, ValueError) as e:
+                self.rejected[name] = f"无法解析: {e}"
+                continue
+            if available is not None and not used <= set(available):
+                self.rejected[name] = f"没有这些列: {', '.join(sorted(used - set(available)))}"
+                continue
+
+            i = len(self.names)
+            self.names.append(name)
+            self.columns |= used
+            if simple is not None:
+                column, op, value = simple
+                indexes, thresholds = self._grouped[(column, op)]
+                indexes.append(i)
+                thresholds.append(value)
+            else:
+                self._general.append((i, func))
+
+        self._grouped = {key: (np.array(indexes), np.array(thresholds))
+                         for key, (indexes, thresholds) in self._grouped.items()}
+
+    def evaluate_mask(self, columns):
+        """返回 规则数 × 股票数 的布尔矩阵；columns 为 {列名: 等长数组}"""
+        missing = self.columns - set(columns)
+        if missing:
+            raise KeyError(f"报警规则缺少列: {', '.join(sorted(missing))}")
+        size = len(next(iter(columns.values()))) if columns else 0
+        mask = np.zeros((len(self.names), size), dtype=bool)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for (column, op), (indexes, thresholds) in self._grouped.items():
+                values = np.asarray(columns[column], dtype=float)
+                mask[indexes] = _COMPARE_OPS[op](values[None, :], thresholds[:, None])
+            for i, func in self._general:
+                mask[i] = np.broadcast_to(func(columns), (size,))
+        return mask
+
+    def triggered(self, columns):
+        """返回触发的 (股票序号数组, 规则序号数组)，按股票顺序排列"""
+        return np.nonzero(self.evaluate_mask(columns).T)
+
+    def evaluate(self, columns, symbols):
+        """返回触发的 [(股票, 规则名)]，按股票顺序排列"""
+        symbol_idx, rule_idx = self.triggered(columns)
+        return [(symbols[s], self.names[r]) for s, r in zip(symbol_idx, rule_idx)]
@@ -0,0 +1,169 @@
+# 全市场日线回补
+# 页面里都是用到哪只股票才临时拉哪只的历史，想一次建好5000只 × 多年的本地数据，
+# 串行调用要跑好几个小时，中途断网或者报错又得从头再来。
+# 这个脚本遍历A股全部代码，用有上限的线程池并发拉取、经 fetch_scheduler 按数据源限速，写进 bar_store 的本地仓库（分析脚本读的就是它）。
+# 每只股票的完成状态记进断点文件并定期落盘，中断后重新运行会从停下的地方接着跑；运行中定期打印 只/秒 和 字节/秒。
+#
+# 运行：
+#     python backfill.py                     # 全市场
+#     python backfill.py --workers 8
+#     python backfill.py --symbols 600519 000001
+#     python backfill.py --restart           # 忽略断点，重新跑一遍
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import akshare as ak
+
+import bar_store
+import fetch_scheduler
+from concurrent_fetch import DEFAULT_MAX_WORKERS
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "backfill")
+
+# 进度打印和断点保存间隔（秒）
+REPORT_INTERVAL = 10
+
+DONE = "done"
+FAILED = "failed"
+
+
+def universe():
+    """A股全部股票代码"""
+    return fetch_scheduler.call("akshare", ak.stock_info_a_code_name)['code'].astype(str).str.zfill(6).tolist()
+
+
+class Checkpoint:
+    """每只股票的完成状态，按收盘定型日分批：换了交易日就是新的一轮回补"""
+
+    def __init__(self, path, cutoff_date, restart=False):
+        self.path = path
+        self.cutoff_date = cutoff_date
+        self._lock = threading.Lock()
+        self.symbols = {}
+        if not restart and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("cutoff_date") == cutoff_date:
+                self.symbols = saved.get("symbols", {})
+
+    def is_done(self, symbol):
+        return self.symbols.get(symbol, {}).get("status") == DONE
+
+    def mark(self, symbol, status, rows=0, error=None):
+        with self._lock:
+            entry = {"status": status, "rows": rows}
+            if error is not None:
+                entry["error"] = error
+            self.symbols[symbol] = entry
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"cutoff_date": self.cutoff_date, "symbols": self.symbols}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def failed(self):
+        return [s for s, entry in self.symbols.items() if entry["status"] == FAILED]
+
+
+class Throughput:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, ok, rows=0, written=0):
+        with self._lock:
+            self.done += 1
+            self.failed += 0 if ok else 1
+            self.rows += rows
+            self.bytes += written
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return (f"进度 {self.done}/{self.total}（失败 {self.failed}），新增 {self.rows} 行，"
+                f"{self.done / elapsed:.2f} 只/秒，{self.bytes / elapsed / 1024:.1f} KB/秒，已用 {elapsed:.0f} 秒")
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def backfill_symbol(symbol):
+    """回补一只股票的不复权日线和复权因子，返回 (新增行数, 写入字节数)"""
+    path = bar_store.bar_path(symbol)
+    before = _file_size(path)
+    # 回补是批量请求，页面上的交互请求优先放行
+    with fetch_scheduler.priority(fetch_scheduler.BATCH):
+        rows = bar_store.update_bars(symbol)
+    return rows, max(_file_size(path) - before, 0) if rows else 0
+
+
+def run(symbols, workers=DEFAULT_MAX_WORKERS, restart=False):
+    cutoff_date = bar_store.last_close_cutoff().strftime("%Y%m%d")
+    checkpoint = Checkpoint(os.path.join(CHECKPOINT_DIR, "checkpoint.json"), cutoff_date, restart)
+    pending = [s for s in symbols if not checkpoint.is_done(s)]
+    print(f"截至 {cutoff_date}：共 {len(symbols)} 只，已完成 {len(symbols) - len(pending)} 只，待回补 {len(pending)} 只")
+
+    stats = Throughput(len(pending))
+    last_report = time.monotonic()
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(backfill_symbol, symbol): symbol for symbol in pending}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                rows, written = future.result()
+                checkpoint.mark(symbol, DONE, rows)
+                stats.add(True, rows, written)
+            except Exception as e:
+                checkpoint.mark(symbol, FAILED, error=str(e))
+                stats.add(False)
+                print(f"{symbol} 回补失败: {e}")
+            if time.monotonic() - last_report >= REPORT_INTERVAL:
+                checkpoint.save()
+                print(stats.report())
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        print("已中断，断点已保存，重新运行即可继续")
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        checkpoint.save()
+
+    print(stats.report())
+    failed = checkpoint.failed()
+    if failed:
+        print(f"{len(failed)} 只失败，重新运行会再试: {', '.join(failed[:20])}{' ...' if len(failed) > 20 else ''}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全市场日线回补（可断点续跑）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="并发线程数")
+    parser.add_argument("--symbols", nargs="*", help="只回补这些代码，默认全市场")
+    parser.add_argument("--restart", action="store_true", help="忽略断点重新开始")
+    args = parser.parse_args()
+
+    symbols = args.symbols or universe()
+    run(symbols, args.workers, args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# 日线合成周线、月线、N日线
+# 技术指标页面每切换一次“分析周期”，就要带 period="weekly"/"monthly" 重新请求 ak.stock_zh_a_hist。
+# 这里直接用本地仓库里的日线合成：按交易日历划分周期，开盘取第一根、最高取最大、最低取最小、
+# 收盘取最后一根、成交量成交额求和，周期K线的日期是该周期内最后一个交易日。
+# 传入多只股票的长表时按 (股票, 周期) 一次 groupby 全部算完，切换周期不再走网络。
+#
+# 用法：
+#     weekly = resample_bars(daily_df, "weekly")
+#     five_day = resample_bars(daily_df, 5)
+#     panel = resample_bars(long_df, "monthly", symbol_column="股票代码")
+
+import numpy as np
+import pandas as pd
+
+import trade_calendar
+from bar_store import DATE_COLUMN
+
+PERIODS = ("daily", "weekly", "monthly")
+
+# 周期内各列的合成方式，日线里没有的列自动跳过
+AGGREGATIONS = {
+    DATE_COLUMN: "last",
+    "开盘": "first",
+    "收盘": "last",
+    "最高": "max",
+    "最低": "min",
+    "成交量": "sum",
+    "成交额": "sum",
+    "换手率": "sum",
+}
+
+
+def period_keys(dates, period):
+    """每个日期所属周期的编号；N日线按交易日序号分段，不同股票的分段边界一致"""
+    values = pd.to_datetime(pd.Series(dates)).values.astype("datetime64[D]")
+    if period == "weekly":
+        # 1970-01-01 是周四，加3天后整除7得到以周一开始的周编号
+        return (values.astype(np.int64) + 3) // 7
+    if period == "monthly":
+        return values.astype("datetime64[M]").astype(np.int64)
+    if isinstance(period, (int, np.integer)) and period > 0:
+        return trade_calendar.to_ordinals(values) // period
+    raise ValueError(f"不支持的周期: {period}")
+
+
+def period_start(day, period):
+    """day 所在周期的第一天，按周期取数时从这天开始读日线，避免第一根周期K线不完整"""
+    day = pd.Timestamp(day).normalize()
+    if period == "weekly":
+        return day - pd.Timedelta(days=day.weekday())
+    if period == "monthly":
+        return day.replace(day=1)
+    if isinstance(period, (int, np.integer)) and period > 0:
+        days = trade_calendar.trading_days()
+        ordinal = trade_calendar.to_ordinals([day])[0]
+        return pd.Timestamp(days[max(ordinal // period * period, 0)])
+    return day
+
+
+def resample_bars(df, period, symbol_column=None):
+    """把日线合成为指定周期，返回与日线同样的中文列；period 为 daily/weekly/monthly 或正整数N"""
+    if period == "daily" or df.empty:
+        return df
+    df = df.sort_values([symbol_column, DATE_COLUMN] if symbol_column else DATE_COLUMN)
+    keys = [df[symbol_column].to_numpy()] if symbol_column else []
+    keys.append(period_keys(df[DATE_COLUMN], period))
+
+    aggregations = {column: how for column, how in AGGREGATIONS.items() if column in df.columns}
+    bars = df.groupby(keys, sort=False).agg(aggregations).reset_index(drop=True)
+    if symbol_column:
+        bars.insert(0, symbol_column, df.groupby(keys, sort=False)[symbol_column].first().to_numpy())
+
+    # 涨跌额、涨跌幅、振幅相对上一周期收盘重新计算
+    if "收盘" in bars.columns:
+        previous_close = bars.groupby(symbol_column)["收盘"].shift(1) if symbol_column else bars["收盘"].shift(1)
+        if "涨跌额" in df.columns:
+            bars["涨跌额"] = bars["收盘"] - previous_close
+        if "涨跌幅" in df.columns:
+            bars["涨跌幅"] = (bars["收盘"] / previous_close - 1) * 100
+        if "振幅" in df.columns and {"最高", "最低"} <= set(bars.columns):
+            bars["振幅"] = (bars["最高"] - bars["最低"]) / previous_close * 100
+
+    # 保持日线的列顺序
+    return bars[[column for column in df.columns if column in bars.columns]]
@@ -0,0 +1,280 @@
+# 本地日线仓库
+# 各个脚本原来每次运行都用 ak.stock_zh_a_hist 拉全量历史再用pandas切片，一只股票动辄好几秒。
+# 这里把日线按股票代码分区存成Parquet文件，每次只追加最后一根已存K线之后的新数据，
+# 读取时支持按日期区间下推过滤和按列投影，页面重开只需要读一次本地文件。
+#
+# 仓库里只存一份不复权K线，另存每只股票的后复权因子；前复权、后复权都在本地用因子乘出来，
+# 同一只股票不用再按三种复权方式各下载一遍。
+# 因子直接由不复权K线推出：交易所在除权除息日公布的前收盘是除权参考价，
+# 所以 前一日收盘 / (当日收盘 - 当日涨跌额) 就是当天的复权比例，非除权日恰好为1。
+# 有新的分红送转时只会多出一个因子变化点，不复权K线照常追加，只重写很小的因子表。
+#
+# 目录结构： data/bars/raw/<股票代码>.parquet       不复权日线
+#           data/bars/factors/<股票代码>.parquet   后复权因子（只保留因子变化的日期）
+#           data/bars/synced/<股票代码>.txt        最近一次追加同步到的收盘日；缺口修补也会重写日线文件，不能拿文件时间判断
+
+import os
+from datetime import datetime, time, timedelta
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+import fetch_scheduler
+import trade_calendar
+
+BAR_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "bars")
+
+# 收盘后到这个时间点，当日K线视为定型，可以落盘
+MARKET_CLOSE = time(15, 30)
+
+DATE_COLUMN = "日期"
+FACTOR_COLUMN = "复权因子"
+FIRST_DATE = "19700101"
+LAST_DATE = "20500101"
+
+# 复权时要乘因子的列；成交量、成交额、涨跌幅、振幅、换手率不受复权影响
+PRICE_COLUMNS = ["开盘", "收盘", "最高", "最低", "涨跌额"]
+
+
+def bar_path(symbol):
+    return os.path.join(BAR_STORE_DIR, "raw", f"{symbol}.parquet")
+
+
+def factor_path(symbol):
+    return os.path.join(BAR_STORE_DIR, "factors", f"{symbol}.parquet")
+
+
+def sync_stamp_path(symbol):
+    return os.path.join(BAR_STORE_DIR, "synced", f"{symbol}.txt")
+
+
+def synced_through(symbol):
+    """最近一次追加同步到的收盘日，没同步过返回 None"""
+    path = sync_stamp_path(symbol)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return pd.Timestamp(f.read().strip()).date()
+
+
+def _mark_synced(symbol, day):
+    path = sync_stamp_path(symbol)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(day.strftime("%Y-%m-%d"))
+    os.replace(tmp_path, path)
+
+
+def stored_symbols():
+    """仓库里已有日线文件的股票代码"""
+    directory = os.path.dirname(bar_path(""))
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len(".parquet")] for name in os.listdir(directory) if name.endswith(".parquet"))
+
+
+def last_close_cutoff(now=None):
+    """最近一个交易日收盘定型的时间点，本地文件在此之后同步过即视为最新"""
+    now = now or datetime.now()
+    day = now.date()
+    if not trade_calendar.is_trading_day(day) or now.time() < MARKET_CLOSE:
+        day = trade_calendar.previous_trading_day(day)
+    return datetime.combine(day, MARKET_CLOSE)
+
+
+def fetch_bars(symbol, start_date, end_date, adjust=""):
+    df = fetch_scheduler.call("akshare", ak.stock_zh_a_hist, symbol=symbol, period="daily",
+                              start_date=start_date, end_date=end_date, adjust=adjust)
+    if df is None or df.empty:
+        return pd.DataFrame()
+    df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN])
+    return df
+
+
+def _write_bars(path, df):
+    # 先写临时文件再替换，避免并发读到写了一半的文件
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _ratios(previous_close, close, change):
+    """每根K线相对前一根的复权比例：前一日收盘 / 除权参考价"""
+    reference = close - change
+    ratios = np.ones(len(close))
+    # 价格和涨跌额都精确到分，非除权日参考价就等于前一日收盘
+    is_event = (reference > 0) & ~np.isclose(previous_close, reference, rtol=0, atol=0.005)
+    ratios[is_event] = previous_close[is_event] / reference[is_event]
+    return ratios
+
+
+def compute_factors(raw):
+    """由不复权K线推出后复权因子表，只保留第一根K线和因子变化的日期"""
+    if raw.empty:
+        return pd.DataFrame({DATE_COLUMN: pd.Series(dtype="datetime64[ns]"), FACTOR_COLUMN: pd.Series(dtype=float)})
+    raw = raw.sort_values(DATE_COLUMN)
+    close = raw['收盘'].to_numpy(dtype=float)
+    ratios = np.ones(len(raw))
+    ratios[1:] = _ratios(close[:-1], close[1:], raw['涨跌额'].to_numpy(dtype=float)[1:])
+    changed = ratios != 1.0
+    changed[0] = True
+    return pd.DataFrame({
+        DATE_COLUMN: raw[DATE_COLUMN].to_numpy()[changed],
+        FACTOR_COLUMN: np.cumprod(ratios)[changed],
+    })
+
+
+def load_factors(symbol):
+    path = factor_path(symbol)
+    if not os.path.exists(path):
+        return compute_factors(pd.DataFrame())
+    return pd.read_parquet(path)
+
+
+def _update_factors(symbol, raw):
+    """因子表有变化（首次建表或出现新的除权除息）时才重写"""
+    factors = compute_factors(raw)
+    path = factor_path(symbol)
+    if os.path.exists(path):
+        stored = pd.read_parquet(path)
+        if len(stored) == len(factors) and np.allclose(stored[FACTOR_COLUMN], factors[FACTOR_COLUMN]) \
+                and (stored[DATE_COLUMN].to_numpy() == factors[DATE_COLUMN].to_numpy()).all():
+            return False
+    _write_bars(path, factors)
+    return True
+
+
+def apply_factors(df, factors, adjust):
+    """把不复权K线换算成前复权(qfq)或后复权(hfq)，df 需含日期列"""
+    if not adjust or df.empty or factors.empty:
+        return df
+    if adjust not in ("qfq", "hfq"):
+        raise ValueError(f"不支持的复权方式: {adjust}")
+    positions = np.searchsorted(factors[DATE_COLUMN].to_numpy(), df[DATE_COLUMN].to_numpy(), side="right") - 1
+    values = factors[FACTOR_COLUMN].to_numpy()
+    scale = values[np.maximum(positions, 0)]
+    if adjust == "qfq":
+        scale = scale / values[-1]
+    df = df.copy()
+    for column in PRICE_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].to_numpy(dtype=float) * scale
+    return df
+
+
+def update_bars(symbol):
+    """把本地缺失的已收盘K线追加进仓库并同步复权因子，返回新增的行数"""
+    path = bar_path(symbol)
+    cutoff = last_close_cutoff()
+    synced = synced_through(symbol)
+    if os.path.exists(path) and synced is not None and synced >= cutoff.date():
+        return 0
+
+    stored = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+    end_date = cutoff.strftime("%Y%m%d")
+
+    if stored.empty:
+        merged = fetch_bars(symbol, FIRST_DATE, end_date)
+    else:
+        # 不复权价不会被后来的除权除息改写，只要最后一根之后的新K线
+        last_date = stored[DATE_COLUMN].max()
+        fresh = fetch_bars(symbol, (last_date + timedelta(days=1)).strftime("%Y%m%d"), end_date)
+        new_rows = fresh[fresh[DATE_COLUMN] > last_date] if not fresh.empty else fresh
+        if new_rows.empty:
+            # 没有新K线也记下同步点，当天不再重复请求
+            _mark_synced(symbol, cutoff.date())
+            return 0
+        merged = pd.concat([stored, new_rows], ignore_index=True)
+
+    if merged.empty:
+        return 0
+    merged = merged[merged[DATE_COLUMN] <= pd.Timestamp(cutoff.date())]
+    _write_bars(path, merged)
+    _update_factors(symbol, merged)
+    _mark_synced(symbol, cutoff.date())
+    return len(merged) - len(stored)
+
+
+def insert_bars(symbol, rows):
+    """把补回来的不复权K线并入本地文件，按日期去重排序并重算因子，返回新增的行数"""
+    if rows.empty:
+        return 0
+    path = bar_path(symbol)
+    stored = pd.read_parquet(path) if os.path.exists(path) else pd.DataFrame()
+    merged = pd.concat([stored, rows], ignore_index=True)
+    merged = merged.drop_duplicates(DATE_COLUMN, keep="first").sort_values(DATE_COLUMN, ignore_index=True)
+    _write_bars(path, merged)
+    _update_factors(symbol, merged)
+    return len(merged) - len(stored)
+
+
+def _with_date(columns):
+    # 复权需要按日期对齐因子，投影时先带上日期列
+    if columns is None or DATE_COLUMN in columns:
+        return columns
+    return [DATE_COLUMN] + list(columns)
+
+
+def load_bars(symbol, start_date=None, end_date=None, columns=None, adjust="qfq"):
+    """只读本地仓库，日期区间和列都下推到Parquet读取，复权价用本地因子换算"""
+    path = bar_path(symbol)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns)
+
+    filters = []
+    if start_date is not None:
+        filters.append((DATE_COLUMN, ">=", pd.Timestamp(start_date)))
+    if end_date is not None:
+        filters.append((DATE_COLUMN, "<=", pd.Timestamp(end_date)))
+    df = pd.read_parquet(path, columns=_with_date(columns) if adjust else columns, filters=filters or None)
+    df = apply_factors(df, load_factors(symbol), adjust)
+    return df[columns] if columns is not None else df
+
+
+def _today_bar(symbol, factors):
+    """盘中尚未定型的当日不复权K线；当天是除权日时顺带补一个临时因子（都不落盘）"""
+    today = datetime.now().strftime("%Y%m%d")
+    tail = fetch_bars(symbol, today, today)
+    if tail.empty or factors.empty:
+        return tail, factors
+    stored = pd.read_parquet(bar_path(symbol), columns=[DATE_COLUMN, '收盘']).sort_values(DATE_COLUMN)
+    ratio = _ratios(stored['收盘'].to_numpy(dtype=float)[-1:], tail['收盘'].to_numpy(dtype=float)[:1],
+                    tail['涨跌额'].to_numpy(dtype=float)[:1])[0]
+    if ratio != 1.0:
+        event = pd.DataFrame({DATE_COLUMN: tail[DATE_COLUMN].to_numpy()[:1],
+                              FACTOR_COLUMN: [factors[FACTOR_COLUMN].iloc[-1] * ratio]})
+        factors = pd.concat([factors, event], ignore_index=True)
+    return tail, factors
+
+
+def get_stock_hist(symbol, start_date=FIRST_DATE, end_date=LAST_DATE, adjust="", columns=None):
+    """ak.stock_zh_a_hist 的本地替代，返回同样的中文列，日期列为datetime"""
+    try:
+        update_bars(symbol)
+    except Exception as e:
+        # 网络异常时仍然返回本地已有的数据
+        if not os.path.exists(bar_path(symbol)):
+            raise
+        print(f"更新 {symbol} 日线失败，使用本地数据: {e}")
+
+    read_columns = _with_date(columns)
+    df = load_bars(symbol, start_date, end_date, read_columns, adjust="")
+    factors = load_factors(symbol)
+
+    # 交易日盘中请求到今天时，补上尚未定型的当日K线（不落盘）
+    today = datetime.now().date()
+    if (pd.Timestamp(end_date) >= pd.Timestamp(today) and last_close_cutoff().date() < today
+            and trade_calendar.is_trading_day(today)):
+        try:
+            tail, factors = _today_bar(symbol, factors)
+        except Exception as e:
+            print(f"获取 {symbol} 当日K线失败: {e}")
+            tail = pd.DataFrame()
+        if not tail.empty:
+            df = pd.concat([df, tail[read_columns] if read_columns else tail], ignore_index=True)
+
+    df = apply_factors(df, factors, adjust)
+    return df[columns] if columns is not None else df
@@ -0,0 +1,44 @@
+# 多日期并发查询
+# 最高板这类页面要按交易日逐天查询问财，串行执行时页面要卡几十秒。
+# 这里用有上限的线程池并发执行每个日期的查询，数据源的限速和优先级由 fetch_scheduler 统一负责，
+# 结果保持日期顺序，单个日期出错不影响其他日期，并记录每个日期的耗时。
+
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import fetch_scheduler
+
+DEFAULT_MAX_WORKERS = 4
+
+DateResult = namedtuple("DateResult", ["date", "data", "error", "elapsed"])
+
+
+def fetch_by_date(dates, fetch, max_workers=DEFAULT_MAX_WORKERS):
+    """对每个日期并发调用 fetch(date)，按传入顺序返回 DateResult 列表"""
+    # 工作线程沿用调用方的请求优先级
+    level = fetch_scheduler.current_priority()
+
+    def run(date):
+        started = time.perf_counter()
+        try:
+            with fetch_scheduler.priority(level):
+                return DateResult(date, fetch(date), None, time.perf_counter() - started)
+        except Exception as e:
+            return DateResult(date, None, e, time.perf_counter() - started)
+
+    if not dates:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(dates)))) as pool:
+        return list(pool.map(run, dates))
+
+
+def timing_summary(results):
+    """每个日期的耗时表，便于页面展示"""
+    return pd.DataFrame({
+        '日期': [r.date for r in results],
+        '耗时(秒)': [round(r.elapsed, 2) for r in results],
+        '状态': ['失败' if r.error is not None else '成功' for r in results],
+    })
@@ -0,0 +1,269 @@
+# 共享内存数据面
+# Streamlit 多页面应用和各个独立页面，每个会话都各自拉一份、存一份同样的快照和涨停池；
+# 用进程池并行计算时，大DataFrame还要pickle一遍发给每个子进程。
+# 这里把常用数据集按列放进一块命名共享内存，再写一份带版本号的清单（data/plane/<数据集>.json）。
+# 其他进程或会话按清单直接映射同一块内存，拿到的列都是零拷贝的NumPy视图，用户和进程再多内存也不跟着涨。
+#
+# 发布新版本时先建好新的共享内存、再替换清单，最后释放本进程发布的旧版本；已经映射旧版本的读者不受影响。
+# 读者的数组（以及 to_frame 得到的零拷贝列）直接引用映射，只要还有数组在用，旧版本的映射就不会被关闭。
+# 共享内存归发布它的进程所有，发布进程退出时自动释放，之后的读者会重新拉取发布。
+# 文字列存成定长 unicode 数组，category 列存编码和类别表；缺失的文字存为空字符串。
+# 价格面板本身已是内存映射文件（见 price_panel），页缓存天然共享，这里也可以把面板字段作为数组发布。
+#
+# 用法：
+#     data_plane.publish('spot_em', df)
+#     dataset = data_plane.attach('spot_em')        # 其他进程
+#     dataset.columns['最新价']                      # 零拷贝视图
+#     df = data_plane.get_or_publish('spot_em', fetch, max_age=30).to_frame()   # 过期时并发的会话只拉取一次
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+import single_flight
+
+PLANE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "plane")
+
+# 列在共享内存里按这个字节数对齐
+ALIGNMENT = 64
+
+# 本进程发布的共享内存要一直持有句柄（Windows 上最后一个句柄关闭时共享内存就会释放）
+_published = {}
+_attached = {}
+# 本进程以读者身份打开的映射；旧版本等到没有数组引用时才关闭
+_open_segments = []
+_lock = threading.Lock()
+
+
+def _manifest_path(name):
+    return os.path.join(PLANE_DIR, f"{name}.json")
+
+
+def _read_manifest(name):
+    path = _manifest_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _to_arrays(data):
+    """DataFrame 或 {列名: 数组} -> ({存储名: 数组}, 列描述列表)"""
+    if isinstance(data, pd.DataFrame):
+        items = [(str(column), data[column]) for column in data.columns]
+    else:
+        items = [(str(column), pd.Series(np.asarray(values)) if np.ndim(values) == 1 else np.asarray(values))
+                 for column, values in data.items()]
+
+    arrays, columns = {}, []
+    for column, values in items:
+        if isinstance(values, np.ndarray):
+            arrays[column] = np.ascontiguousarray(values)
+            columns.append({"name": column, "kind": "array"})
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[f"{column}#codes"] = values.cat.codes.to_numpy()
+            arrays[f"{column}#categories"] = np.asarray(values.cat.categories.astype(str), dtype=str)
+            columns.append({"name": column, "kind": "category"})
+        elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+            arrays[column] = values.to_numpy(dtype="datetime64[ns]")
+            columns.append({"name": column, "kind": "datetime"})
+        elif pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+            arrays[column] = values.to_numpy()
+            columns.append({"name": column, "kind": "array"})
+        else:
+            arrays[column] = np.asarray(values.fillna("").astype(str), dtype=str)
+            columns.append({"name": column, "kind": "string"})
+    return arrays, columns
+
+
+def publish(name, data):
+    """把数据集发布成一个新版本，返回版本号"""
+    arrays, columns = _to_arrays(data)
+    layout, offset = [], 0
+    for key, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout.append({"key": key, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset += array.nbytes
+
+    segment = shared_memory.SharedMemory(name=f"plane_{name}_{uuid.uuid4().hex[:12]}", create=True,
+                                         size=max(offset, 1))
+    for item, array in zip(layout, arrays.values()):
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=item["offset"])
+        view[...] = array
+
+    with _lock:
+        previous = _read_manifest(name)
+        manifest = {
+            "segment": segment.name,
+            "version": (previous["version"] + 1) if previous else 1,
+            "published_at": time.time(),
+            "columns": columns,
+            "layout": layout,
+        }
+        os.makedirs(PLANE_DIR, exist_ok=True)
+        tmp_path = f"{_manifest_path(name)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, _manifest_path(name))
+
+        old = _published.pop(name, None)
+        _published[name] = segment
+    if old is not None:
+        _release(old)
+    return manifest["version"]
+
+
+def _release(segment):
+    """释放旧版本的名字；已映射的读者仍可继续使用，直到它们自己关闭"""
+    try:
+        segment.close()
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+@atexit.register
+def _release_published():
+    """发布进程退出时释放自己发布的共享内存，之后的读者会重新拉取发布"""
+    with _lock:
+        segments = list(_published.values())
+        _published.clear()
+    for segment in segments:
+        _release(segment)
+
+
+class _ReaderSegment(shared_memory.SharedMemory):
+    def __del__(self):
+        # 进程退出时可能还有数组引用着映射，这时关不掉也无妨，交给操作系统回收
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass
+
+
+def _open_segment(segment_name):
+    """以读者身份映射，不登记到 resource_tracker，免得读者退出时把发布者的共享内存删掉"""
+    if sys.version_info >= (3, 13):
+        return _ReaderSegment(name=segment_name, track=False)
+    with _lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            return _ReaderSegment(name=segment_name)
+        finally:
+            resource_tracker.register = register
+
+
+def _sweep_segments():
+    """关闭不再是最新版本、也没有数组引用的映射；调用方持有 _lock"""
+    current = {dataset.segment_name for dataset in _attached.values()}
+    keep = []
+    for segment in _open_segments:
+        if segment.name in current:
+            keep.append(segment)
+            continue
+        try:
+            segment.close()
+        except BufferError:
+            # 还有 DataFrame 或数组指向这块内存
+            keep.append(segment)
+    _open_segments[:] = keep
+
+
+def _view(base, item):
+    dtype = np.dtype(item["dtype"])
+    count = int(np.prod(item["shape"], dtype=np.int64)) * dtype.itemsize
+    return base[item["offset"]:item["offset"] + count].view(dtype).reshape(tuple(item["shape"]))
+
+
+class Dataset:
+    def __init__(self, name, manifest, segment):
+        self.name = name
+        self.version = manifest["version"]
+        self.published_at = manifest["published_at"]
+        self.segment_name = segment.name
+        self._kinds = [(c["name"], c["kind"]) for c in manifest["columns"]]
+        # frombuffer 会一直占用映射的导出，数组还在时 segment.close() 会拒绝关闭，不会读到已释放的内存
+        base = np.frombuffer(segment.buf, dtype=np.uint8)
+        self.arrays = {item["key"]: _view(base, item) for item in manifest["layout"]}
+        for array in self.arrays.values():
+            array.flags.writeable = False
+
+    @property
+    def age(self):
+        """距离发布已过去的秒数"""
+        return time.time() - self.published_at
+
+    @property
+    def columns(self):
+        """{列名: 数组}；category 列返回编码数组，类别表见 arrays['<列名>#categories']"""
+        return {name: self.arrays[f"{name}#codes" if kind == "category" else name] for name, kind in self._kinds}
+
+    def is_current(self):
+        manifest = _read_manifest(self.name)
+        return manifest is not None and manifest["version"] == self.version
+
+    def to_frame(self):
+        """还原成DataFrame；数值列尽量不复制，文字和category列会重建"""
+        data = {}
+        for name, kind in self._kinds:
+            if kind == "category":
+                data[name] = pd.Categorical.from_codes(self.arrays[f"{name}#codes"],
+                                                       categories=self.arrays[f"{name}#categories"])
+            elif kind == "string":
+                data[name] = self.arrays[name].astype(object)
+            else:
+                data[name] = self.arrays[name]
+        return pd.DataFrame(data, copy=False)
+
+
+def attach(name):
+    """映射数据集的最新版本，不存在时返回 None；同一进程对同一版本只映射一次"""
+    for _ in range(3):
+        manifest = _read_manifest(name)
+        if manifest is None:
+            return None
+        with _lock:
+            cached = _attached.get(name)
+            if cached is not None and cached.version == manifest["version"]:
+                return cached
+        try:
+            segment = _open_segment(manifest["segment"])
+        except FileNotFoundError:
+            # 清单刚被替换、旧版本已释放，重读一次清单
+            continue
+        dataset = Dataset(name, manifest, segment)
+        with _lock:
+            _open_segments.append(segment)
+            _attached[name] = dataset
+            _sweep_segments()
+        return dataset
+    return None
+
+
+def get_or_publish(name, fetch, max_age):
+    """有不超过 max_age 秒的版本就直接映射，否则调用 fetch() 拉取并发布；同时过期的多个会话只拉取一次"""
+    dataset = attach(name)
+    if dataset is not None and dataset.age <= max_age:
+        return dataset
+    return single_flight.do(("data_plane", name), _refresh, name, fetch, max_age)
+
+
+def _refresh(name, fetch, max_age):
+    # 排在前面的调用可能刚发布完，再看一眼
+    dataset = attach(name)
+    if dataset is not None and dataset.age <= max_age:
+        return dataset
+    data = fetch()
+    if data is None:
+        return dataset
+    publish(name, data)
+    return attach(name)
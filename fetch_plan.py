@@ -0,0 +1,66 @@
+# 问财请求计划
+# 页面渲染时经常在不同位置重复请求同一份数据，比如“昨日涨停”和“前一交易日涨停”其实是同一个查询。
+# 这里让页面先把需要的数据一次性声明出来，计划器按缓存键合并相同的请求，
+# 把不同的请求并发拉取，再把同一个DataFrame交给所有需要它的地方。
+#
+# 用法：
+#     plan = FetchPlan()
+#     plan.add('today', f"{date}涨停", sort_key='成交金额', sort_order='desc', loop=True)
+#     plan.add('yesterday', f"{prev}涨停", sort_key='成交金额', sort_order='desc', loop=True)
+#     data = plan.run()
+#     data['today']
+#     plan.errors                      # 失败的请求 {name: 异常}，对应的结果是空DataFrame
+#
+# 注意：相同请求拿到的是同一个DataFrame对象，使用方不要原地修改。
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import wencai_cache
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class FetchPlan:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self.max_workers = max_workers
+        self._names = {}
+        self._requests = {}
+        # 上一次 run() 里失败的请求 {name: 异常}
+        self.errors = {}
+
+    def add(self, name, query, sort_key=None, sort_order=None, query_type=None, **kwargs):
+        """声明一份数据需求，name 是使用方取结果时用的名字"""
+        key = wencai_cache.cache_key(query, sort_key, sort_order, query_type, **kwargs)
+        self._names[name] = key
+        self._requests.setdefault(key, (query, sort_key, sort_order, query_type, kwargs))
+        return name
+
+    def run(self):
+        """并发拉取所有不同的请求，返回 {name: DataFrame}；单个请求失败（抛异常或没返回DataFrame）
+        不影响其他请求，失败的记在 errors 里，结果给空DataFrame"""
+        self.errors = {}
+        if not self._requests:
+            return {}
+        workers = max(1, min(self.max_workers, len(self._requests)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                key: pool.submit(wencai_cache.get, query, sort_key, sort_order, query_type, **kwargs)
+                for key, (query, sort_key, sort_order, query_type, kwargs) in self._requests.items()
+            }
+            fetched, failed = {}, {}
+            for key, future in futures.items():
+                try:
+                    result = future.result()
+                except Exception as e:
+                    fetched[key], failed[key] = pd.DataFrame(), e
+                    continue
+                if isinstance(result, pd.DataFrame):
+                    fetched[key] = result
+                else:
+                    # pywencai 查询失败时可能返回 None 而不抛异常，同样按失败处理
+                    fetched[key] = pd.DataFrame()
+                    failed[key] = ValueError(f"问财没有返回表格（{type(result).__name__}）")
+        self.errors = {name: failed[key] for name, key in self._names.items() if key in failed}
+        return {name: fetched[key] for name, key in self._names.items()}
@@ -0,0 +1,222 @@
+# 进程内统一的数据源调度
+# 各个脚本、页面和后台任务各自直接调用 akshare、tushare、问财，彼此不知道对方的存在：
+# 一旦有了并发，很容易超过数据源的频率限制被封；打开页面的请求还要和后台回补抢同一个数据源。
+# 这里所有数据请求都经过 call(数据源, 函数, 参数...)：
+#   - 每个数据源一个令牌桶，按设定的每秒请求数和突发量放行；
+#   - 排队时交互请求（页面）优先于批量请求（回补、修补、录制），同一优先级先到先得；
+#   - 全局和每个数据源分别限制同时在途的请求数；
+#   - metrics() 给出各数据源的排队数、在途数、平均和 P95 排队等待时间，便于观察是否被限流。
+# 请求在调用方自己的线程里执行，调度器只决定什么时候放行，不另开线程。
+#
+# 用法：
+#     df = fetch_scheduler.call("akshare", ak.stock_zh_a_hist, symbol="600519", period="daily")
+#     with fetch_scheduler.priority(fetch_scheduler.BATCH):   # 后台任务，在工作线程里设置
+#         ...
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+INTERACTIVE = 0
+BATCH = 10
+
+# 各数据源每秒放行的请求数和令牌桶容量（允许的突发请求数）
+SOURCE_RATES = {
+    "wencai": 2.0,
+    "akshare": 5.0,
+    "tushare": 3.0,
+}
+SOURCE_BURSTS = {
+    "wencai": 2,
+    "akshare": 5,
+    "tushare": 3,
+}
+
+# 每个数据源同时在途的请求数上限，以及所有数据源合计的上限
+SOURCE_IN_FLIGHT = {
+    "wencai": 2,
+    "akshare": 8,
+    "tushare": 4,
+}
+MAX_IN_FLIGHT = 16
+
+# 统计等待时间时保留最近多少次请求
+METRIC_WINDOW = 1024
+
+_local = threading.local()
+
+
+class TokenBucket:
+    """每秒补充 rate 个令牌，最多攒 burst 个；rate 为空时不限速"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst or 1, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self):
+        """还要等多少秒才有令牌，0 表示现在就有"""
+        if not self.rate:
+            return 0.0
+        self._refill(time.monotonic())
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self):
+        if self.rate:
+            self._tokens -= 1
+
+
+class _SourceState:
+    def __init__(self, source):
+        self.bucket = TokenBucket(SOURCE_RATES.get(source), SOURCE_BURSTS.get(source))
+        self.in_flight_limit = SOURCE_IN_FLIGHT.get(source, MAX_IN_FLIGHT)
+        self.queue = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.waits = deque(maxlen=METRIC_WINDOW)
+        self.durations = deque(maxlen=METRIC_WINDOW)
+
+
+class FetchScheduler:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self._sources = {}
+        self._in_flight = 0
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _state(self, source):
+        if source not in self._sources:
+            self._sources[source] = _SourceState(source)
+        return self._sources[source]
+
+    def _next_grant(self):
+        """可以放行的队首请求里优先级最高的一个 (条目, 数据源)，以及最近一个令牌还要等的秒数"""
+        best, best_source, soonest = None, None, None
+        if self._in_flight >= self.max_in_flight:
+            return None, None, None
+        for source, state in self._sources.items():
+            if not state.queue or state.in_flight >= state.in_flight_limit:
+                continue
+            delay = state.bucket.delay()
+            if delay > 0:
+                soonest = delay if soonest is None else min(soonest, delay)
+            elif best is None or state.queue[0] < best:
+                best, best_source = state.queue[0], source
+        return best, best_source, soonest
+
+    def acquire(self, source, level=None):
+        """排队直到被放行，返回排队的秒数；放行后必须调用 release"""
+        level = current_priority() if level is None else level
+        enqueued = time.monotonic()
+        with self._condition:
+            state = self._state(source)
+            entry = (level, next(self._sequence))
+            heapq.heappush(state.queue, entry)
+            while True:
+                best, best_source, soonest = self._next_grant()
+                if best == entry and best_source == source:
+                    heapq.heappop(state.queue)
+                    state.bucket.take()
+                    state.in_flight += 1
+                    self._in_flight += 1
+                    waited = time.monotonic() - enqueued
+                    state.waits.append(waited)
+                    # 轮到下一个请求检查自己能否放行
+                    self._condition.notify_all()
+                    return waited
+                self._condition.wait(soonest)
+
+    def release(self, source, elapsed=None, failed=False):
+        with self._condition:
+            state = self._sources[source]
+            state.in_flight -= 1
+            self._in_flight -= 1
+            state.completed += 1
+            state.failed += int(failed)
+            if elapsed is not None:
+                state.durations.append(elapsed)
+            self._condition.notify_all()
+
+    def call(self, source, fetch, *args, **kwargs):
+        """排队放行后在当前线程执行 fetch(*args, **kwargs)"""
+        self.acquire(source)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = fetch(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self.release(source, time.perf_counter() - started, failed)
+
+    def metrics(self):
+        """各数据源的调度统计"""
+        with self._condition:
+            rows = []
+            for source, state in self._sources.items():
+                waits = np.array(state.waits) if state.waits else np.zeros(1)
+                durations = np.array(state.durations) if state.durations else np.zeros(1)
+                rows.append({
+                    '数据源': source,
+                    '排队数': len(state.queue),
+                    '其中交互': sum(1 for level, _ in state.queue if level <= INTERACTIVE),
+                    '在途数': state.in_flight,
+                    '已完成': state.completed,
+                    '失败': state.failed,
+                    '平均等待(秒)': round(float(waits.mean()), 3),
+                    'P95等待(秒)': round(float(np.percentile(waits, 95)), 3),
+                    '平均耗时(秒)': round(float(durations.mean()), 3),
+                })
+        return pd.DataFrame(rows, columns=['数据源', '排队数', '其中交互', '在途数', '已完成', '失败',
+                                           '平均等待(秒)', 'P95等待(秒)', '平均耗时(秒)'])
+
+
+def current_priority():
+    """当前线程的请求优先级，默认按交互请求处理"""
+    return getattr(_local, "level", INTERACTIVE)
+
+
+@contextmanager
+def priority(level):
+    """在这段代码里（仅当前线程）发起的请求使用指定优先级"""
+    previous = current_priority()
+    _local.level = level
+    try:
+        yield
+    finally:
+        _local.level = previous
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """进程内共用的调度器"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = FetchScheduler()
+        return _scheduler
+
+
+def call(source, fetch, *args, **kwargs):
+    return get_scheduler().call(source, fetch, *args, **kwargs)
+
+
+def metrics():
+    return get_scheduler().metrics()
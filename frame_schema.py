@@ -0,0 +1,135 @@
+# 行情数据表的紧凑类型
+# ak.stock_zh_a_spot_em 的全市场快照和问财的宽表，拿到手时大部分列是 object 或 float64，
+# 问财里还有不少数字是字符串，页面上只能一行行 safe_float 去转。
+# 这里按数据源定义一份列类型表：代码、名称、行业、概念等重复度高的文字列转成 category，
+# 价格、涨跌幅降到 float32，成交量、天数、排名这类整数降到 int32，金额和市值保留 float64 以免丢精度，
+# 数字字符串统一用一次 pd.to_numeric 向量化解析。Streamlit 进程里同时缓存多天、多会话的数据时内存能省下一大半。
+
+import re
+
+import numpy as np
+import pandas as pd
+
+CATEGORY = 'category'
+FLOAT32 = 'float32'
+FLOAT64 = 'float64'
+INT32 = 'int32'
+
+# ak.stock_zh_a_spot_em 的列类型
+SPOT_EM_SCHEMA = {
+    '序号': INT32,
+    '代码': CATEGORY,
+    '名称': CATEGORY,
+    '最新价': FLOAT32,
+    '涨跌幅': FLOAT32,
+    '涨跌额': FLOAT32,
+    '成交量': INT32,
+    '成交额': FLOAT64,
+    '振幅': FLOAT32,
+    '最高': FLOAT32,
+    '最低': FLOAT32,
+    '今开': FLOAT32,
+    '昨收': FLOAT32,
+    '量比': FLOAT32,
+    '换手率': FLOAT32,
+    '市盈率-动态': FLOAT32,
+    '市净率': FLOAT32,
+    '总市值': FLOAT64,
+    '流通市值': FLOAT64,
+    '涨速': FLOAT32,
+    '5分钟涨跌': FLOAT32,
+    '60日涨跌幅': FLOAT32,
+    '年初至今涨跌幅': FLOAT32,
+}
+
+# 问财宽表的列名带日期后缀，例如 连续涨停天数[20240821]，按去掉后缀的列名匹配
+WENCAI_SCHEMA = {
+    '股票代码': CATEGORY,
+    '股票简称': CATEGORY,
+    'code': CATEGORY,
+    'market_code': CATEGORY,
+    '所属同花顺行业': CATEGORY,
+    '所属概念': CATEGORY,
+    '涨停原因类别': CATEGORY,
+    '涨停类型': CATEGORY,
+    '跌停类型': CATEGORY,
+    '竞价异动类型': CATEGORY,
+    '集合竞价评级': CATEGORY,
+    '首次涨停时间': CATEGORY,
+    '最终涨停时间': CATEGORY,
+    '几天几板': CATEGORY,
+    '最新价': FLOAT32,
+    '最新涨跌幅': FLOAT32,
+    '连续涨停天数': INT32,
+    '涨停开板次数': INT32,
+    '竞价金额排名': INT32,
+}
+
+# 问财宽表里没登记的列：能整列解析成数字的，列名含这些词的保留 float64，其余降为 float32
+WIDE_NUMBER_KEYWORDS = ('金额', '市值', '成交额', '封单额', '成交量', '封单量')
+
+_SUFFIX = re.compile(r'\[[^\]]*\]$')
+
+
+def base_name(column):
+    """去掉问财列名末尾的 [日期] 后缀"""
+    return _SUFFIX.sub('', str(column))
+
+
+def _convert(series, dtype):
+    if dtype == CATEGORY:
+        return series.astype(CATEGORY)
+    values = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+    if dtype == INT32:
+        # 有缺失值时整数列存不下 NaN，退回 float32
+        if values.isna().any() or values.abs().max() > np.iinfo(np.int32).max:
+            return values.astype(FLOAT32)
+        return values.astype(INT32)
+    return values.astype(dtype)
+
+
+def normalize(df, schema):
+    """按列类型表转换，表里没有的列原样保留；返回新的 DataFrame"""
+    if df is None:
+        return None
+    return df.assign(**{column: _convert(df[column], dtype)
+                        for column, dtype in schema.items() if column in df.columns})
+
+
+def normalize_spot_em(df):
+    return normalize(df, SPOT_EM_SCHEMA)
+
+
+def _parses_as_number(series):
+    """文字列里所有非空值都能解析成数字时返回解析结果，否则返回 None"""
+    values = pd.to_numeric(series, errors='coerce')
+    present = series.notna() & (series.astype(str).str.strip() != '')
+    if present.any() and values[present].notna().all():
+        return values
+    return None
+
+
+def normalize_wencai(df):
+    """问财结果：登记过的列按表转换，其余能整列解析成数字的文字列转成数字，非金额类浮点列降为 float32"""
+    if df is None:
+        return None
+    converted = {}
+    for column in df.columns:
+        name = base_name(column)
+        dtype = WENCAI_SCHEMA.get(name)
+        if dtype is not None:
+            converted[column] = _convert(df[column], dtype)
+            continue
+        wide = any(keyword in name for keyword in WIDE_NUMBER_KEYWORDS)
+        if pd.api.types.is_string_dtype(df[column].dtype):
+            values = _parses_as_number(df[column])
+            if values is not None:
+                converted[column] = values.astype(FLOAT64 if wide else FLOAT32)
+        elif df[column].dtype == np.float64 and not wide:
+            converted[column] = df[column].astype(FLOAT32)
+    return df.assign(**converted)
+
+
+def memory_mb(df):
+    """DataFrame 实际占用内存（MB），含 object 列里的字符串"""
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
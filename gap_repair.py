@@ -0,0 +1,200 @@
+# 本地日线缺口检测与定向修补
+# 停牌、拉取到一半断掉、数据源偶尔漏数，都会让本地日线中间少几天，
+# KDJ、MACD、布林带这类滚动窗口指标会悄悄算错。
+# 扫描时每只股票只读日期一列，映射成交易日序号后和交易日历做向量化反连接，找出缺失的交易日并合并成连续区间。
+# 修补时只重新请求缺失的区间（两头各多请求一个交易日）：数据源返回了K线就并入本地；
+# 数据源在某天前后都有K线、唯独这天没有，才确认这天停牌并记下来，以后扫描不再报出。
+# 数据源什么都没返回时算修补失败，不记停牌，下次再试。
+# 一直缺到最近收盘日的缺口，如果数据源在最后一根K线之后也没有数据，就记下这个日期作为终止标记（退市或长期停牌），
+# 以后扫描只查到这天为止；之后又有了新K线（复牌）时，终止标记自动失效。
+#
+# 运行：
+#     python gap_repair.py                   # 只扫描，打印缺口
+#     python gap_repair.py --repair          # 扫描并修补
+#     python gap_repair.py --symbols 600519 --repair
+
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import fetch_scheduler
+import trade_calendar
+from bar_store import DATE_COLUMN
+from concurrent_fetch import DEFAULT_MAX_WORKERS
+
+SUSPENSIONS_PATH = os.path.join(bar_store.BAR_STORE_DIR, "suspensions.csv")
+DELISTINGS_PATH = os.path.join(bar_store.BAR_STORE_DIR, "delistings.csv")
+
+# 扫描只读本地文件，线程可以多开一些
+SCAN_WORKERS = 16
+
+GAP_COLUMNS = ['代码', '开始日期', '结束日期', '缺失天数']
+
+_suspensions_lock = threading.Lock()
+_delistings_lock = threading.Lock()
+
+
+def load_suspensions():
+    """{代码: 停牌日交易日序号数组}"""
+    if not os.path.exists(SUSPENSIONS_PATH):
+        return {}
+    df = pd.read_csv(SUSPENSIONS_PATH, dtype={'代码': str})
+    df['序号'] = trade_calendar.to_ordinals(df['日期'])
+    return {code: group['序号'].to_numpy() for code, group in df.groupby('代码')}
+
+
+def record_suspensions(symbol, days):
+    """把数据源确认没有K线的交易日记为停牌"""
+    if not days:
+        return
+    rows = pd.DataFrame({'代码': symbol, '日期': [pd.Timestamp(d).strftime('%Y-%m-%d') for d in days]})
+    with _suspensions_lock:
+        os.makedirs(os.path.dirname(SUSPENSIONS_PATH), exist_ok=True)
+        rows.to_csv(SUSPENSIONS_PATH, mode='a', index=False, header=not os.path.exists(SUSPENSIONS_PATH))
+
+
+def load_delistings():
+    """{代码: 数据源能提供的最后一个交易日的序号}"""
+    if not os.path.exists(DELISTINGS_PATH):
+        return {}
+    df = pd.read_csv(DELISTINGS_PATH, dtype={'代码': str})
+    df['序号'] = trade_calendar.to_ordinals(df['日期'])
+    return df.groupby('代码')['序号'].max().to_dict()
+
+
+def record_delisting(symbol, day):
+    """记下数据源在这天之后再没有K线，扫描到这天为止"""
+    row = pd.DataFrame({'代码': [symbol], '日期': [pd.Timestamp(day).strftime('%Y-%m-%d')]})
+    with _delistings_lock:
+        os.makedirs(os.path.dirname(DELISTINGS_PATH), exist_ok=True)
+        row.to_csv(DELISTINGS_PATH, mode='a', index=False, header=not os.path.exists(DELISTINGS_PATH))
+
+
+def _runs(ordinals):
+    """有序交易日序号切成连续区间 [(起, 止)]"""
+    if len(ordinals) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(ordinals) != 1)
+    starts = np.concatenate(([ordinals[0]], ordinals[breaks + 1]))
+    ends = np.concatenate((ordinals[breaks], [ordinals[-1]]))
+    return list(zip(starts, ends))
+
+
+def find_gaps(symbol, cutoff_ordinal=None, suspended=None, last_ordinal=None):
+    """一只股票从首根K线到最近收盘日（有终止标记 last_ordinal 时到该日）之间缺失的交易日，
+    返回 [(开始日期, 结束日期, 缺失天数)]"""
+    path = bar_store.bar_path(symbol)
+    if not os.path.exists(path):
+        return []
+    dates = pd.read_parquet(path, columns=[DATE_COLUMN])[DATE_COLUMN]
+    if dates.empty:
+        return []
+    if cutoff_ordinal is None:
+        cutoff_ordinal = trade_calendar.to_ordinals([bar_store.last_close_cutoff().date()])[0]
+
+    ordinals = trade_calendar.to_ordinals(dates)
+    first = ordinals.min()
+    # 终止标记之后又有K线说明已经复牌，标记作废
+    if last_ordinal is not None and last_ordinal >= ordinals.max():
+        cutoff_ordinal = min(cutoff_ordinal, last_ordinal)
+    present = np.zeros(max(cutoff_ordinal - first + 1, 0), dtype=bool)
+    for known in (ordinals, suspended if suspended is not None else np.empty(0, dtype=np.int64)):
+        known = known[(known >= first) & (known <= cutoff_ordinal)]
+        present[known - first] = True
+
+    days = trade_calendar.trading_days()
+    return [(days[start], days[end], int(end - start + 1))
+            for start, end in _runs(np.flatnonzero(~present) + first)]
+
+
+def scan(symbols=None, workers=SCAN_WORKERS):
+    """扫描多只股票的缺口，返回 DataFrame[代码, 开始日期, 结束日期, 缺失天数]"""
+    symbols = symbols or bar_store.stored_symbols()
+    cutoff_ordinal = trade_calendar.to_ordinals([bar_store.last_close_cutoff().date()])[0]
+    suspensions = load_suspensions()
+    delistings = load_delistings()
+
+    def scan_one(symbol):
+        return [(symbol,) + gap for gap in find_gaps(symbol, cutoff_ordinal, suspensions.get(symbol),
+                                                     delistings.get(symbol))]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = [row for gaps in pool.map(scan_one, symbols) for row in gaps]
+    gaps = pd.DataFrame(rows, columns=GAP_COLUMNS)
+    gaps['开始日期'] = pd.to_datetime(gaps['开始日期'])
+    gaps['结束日期'] = pd.to_datetime(gaps['结束日期'])
+    return gaps
+
+
+def repair_symbol(symbol, gaps):
+    """重新请求一只股票的缺失区间，返回 (补回行数, 记为停牌的天数)"""
+    filled, suspended = 0, 0
+    cutoff_day = bar_store.last_close_cutoff().date()
+
+    for start, end in zip(gaps['开始日期'], gaps['结束日期']):
+        wanted = trade_calendar.trading_days_between(start, end)
+        # 两头各多要一个交易日，才能判断缺的那天前后数据源都有K线
+        request_start = trade_calendar.previous_trading_day(start)
+        request_end = trade_calendar.next_trading_day(end)
+        # 仓库存的是不复权价，不会因除权除息整体变动，补进来的区间可以直接拼接，因子随之重算
+        with fetch_scheduler.priority(fetch_scheduler.BATCH):
+            fresh = bar_store.fetch_bars(symbol, request_start.strftime('%Y%m%d'), request_end.strftime('%Y%m%d'))
+        if fresh.empty:
+            raise RuntimeError(f"数据源没有返回 {start:%Y-%m-%d} 至 {end:%Y-%m-%d} 的K线，稍后重试")
+
+        rows = fresh[(fresh[DATE_COLUMN] >= start) & (fresh[DATE_COLUMN] <= end)]
+        filled += bar_store.insert_bars(symbol, rows)
+        returned = set(rows[DATE_COLUMN].dt.date)
+        first, last = fresh[DATE_COLUMN].min().date(), fresh[DATE_COLUMN].max().date()
+        missing = [day for day in wanted if day not in returned and first < day < last]
+        record_suspensions(symbol, missing)
+        suspended += len(missing)
+        # 缺到最近收盘日、数据源在缺口里一根K线都没有：这只股票的数据到 last 为止
+        if end.date() >= cutoff_day and last < start.date():
+            record_delisting(symbol, last)
+    return filled, suspended
+
+
+def repair(gaps, workers=DEFAULT_MAX_WORKERS):
+    """按股票并发修补，返回 DataFrame[代码, 补回行数, 停牌天数, 错误]"""
+    def repair_one(item):
+        symbol, symbol_gaps = item
+        try:
+            filled, suspended = repair_symbol(symbol, symbol_gaps)
+            return symbol, filled, suspended, None
+        except Exception as e:
+            return symbol, 0, 0, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(repair_one, gaps.groupby('代码')))
+    return pd.DataFrame(results, columns=['代码', '补回行数', '停牌天数', '错误'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地日线缺口检测与修补")
+    parser.add_argument("--symbols", nargs="*", help="只检查这些代码，默认仓库里全部")
+    parser.add_argument("--repair", action="store_true", help="重新请求缺失区间")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="修补时的并发线程数")
+    args = parser.parse_args()
+
+    gaps = scan(args.symbols)
+    print(f"{gaps['代码'].nunique()} 只股票共 {len(gaps)} 个缺口，缺失 {gaps['缺失天数'].sum()} 个交易日")
+    if gaps.empty:
+        return
+    print(gaps.to_string(index=False))
+
+    if args.repair:
+        results = repair(gaps, args.workers)
+        print(f"补回 {results['补回行数'].sum()} 行，记为停牌 {results['停牌天数'].sum()} 天")
+        failed = results[results['错误'].notna()]
+        if not failed.empty:
+            print(failed.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# 本地分钟线仓库
+# 仓库里原来没有任何分时数据：量比只能用日线成交量估算，竞价分析、盘中监控也看不到当天的走势。
+# 这里每只股票每天一个定长记录的二进制文件，盘中新分钟线直接追加到文件末尾，不用重写整个文件；
+# 数据源返回的最后一根往往是还没走完的分钟，下次同步时用完整的那根覆盖文件末尾一条。
+# 收盘后可以把一天的所有股票合并成一个分区文件（合并后不再接受追加），一次读出全市场当天的分钟线做盘中扫描。
+# 需要5/15/30/60分钟线时按A股上午、下午两个交易时段在本地合成。
+#
+# 目录结构： data/minutes/<交易日>/<股票代码>.bin    盘中逐只追加
+#           data/minutes/<交易日>.npz              收盘后合并的全市场分区
+#
+# 运行（盘中每分钟同步一遍自选股）：
+#     python minute_store.py --symbols 600519 000001 --interval 60
+
+import argparse
+import glob
+import os
+import time
+from datetime import datetime
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+import fetch_scheduler
+import trade_calendar
+
+MINUTE_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "minutes")
+
+# 一条分钟线记录：minute 为当天 0 点起的分钟数（K线结束时刻，09:31 即 571）
+MINUTE_DTYPE = np.dtype([
+    ('minute', '<i2'),
+    ('open', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('close', '<f4'),
+    ('volume', '<f8'),
+    ('amount', '<f8'),
+])
+
+SOURCE_COLUMNS = {'开盘': 'open', '最高': 'high', '最低': 'low', '收盘': 'close', '成交量': 'volume', '成交额': 'amount'}
+
+# A股连续竞价时段（分钟数）：上午 09:30-11:30，下午 13:00-15:00，各120分钟
+MORNING_OPEN = 9 * 60 + 30
+AFTERNOON_OPEN = 13 * 60
+SESSION_MINUTES = 120
+
+RESAMPLE_PERIODS = (1, 5, 15, 30, 60)
+
+
+def _day(trade_date):
+    return pd.Timestamp(trade_date).strftime('%Y%m%d')
+
+
+def minute_path(symbol, trade_date):
+    return os.path.join(MINUTE_STORE_DIR, _day(trade_date), f"{symbol}.bin")
+
+
+def partition_path(trade_date):
+    return os.path.join(MINUTE_STORE_DIR, f"{_day(trade_date)}.npz")
+
+
+def to_records(df):
+    """ak 分钟线（时间、开盘、收盘…）转成定长记录数组"""
+    times = pd.to_datetime(df['时间'])
+    records = np.empty(len(df), dtype=MINUTE_DTYPE)
+    records['minute'] = times.dt.hour * 60 + times.dt.minute
+    for source, field in SOURCE_COLUMNS.items():
+        records[field] = pd.to_numeric(df[source], errors='coerce').to_numpy()
+    return records
+
+
+def _last_minute(path):
+    """文件里最后一条记录的分钟数，只读文件末尾一条"""
+    size = os.path.getsize(path)
+    if size < MINUTE_DTYPE.itemsize:
+        return -1
+    with open(path, 'rb') as f:
+        f.seek(size - size % MINUTE_DTYPE.itemsize - MINUTE_DTYPE.itemsize)
+        return int(np.frombuffer(f.read(MINUTE_DTYPE.itemsize), dtype=MINUTE_DTYPE)['minute'][0])
+
+
+def append_records(symbol, trade_date, records):
+    """把比文件里最后一条更新的记录追加到末尾，返回写入条数。
+    盘中数据源返回的最后一根是还没走完的分钟，下次同步时同一分钟会再出现，这时覆盖文件里的最后一条。"""
+    if os.path.exists(partition_path(trade_date)):
+        raise ValueError(f"{_day(trade_date)} 的分钟线已合并成分区，不能再追加")
+    path = minute_path(symbol, trade_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    last = _last_minute(path) if os.path.exists(path) else -1
+    records = records[records['minute'] >= last]
+    if not len(records):
+        return 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        # 丢掉不完整的尾巴；最后一条要被覆盖时从它的位置开始写
+        count = f.seek(0, os.SEEK_END) // MINUTE_DTYPE.itemsize
+        f.truncate(count * MINUTE_DTYPE.itemsize)
+        overwrite = int(last >= 0 and records['minute'][0] == last)
+        f.seek((count - overwrite) * MINUTE_DTYPE.itemsize)
+        f.write(records.tobytes())
+    return len(records)
+
+
+def fetch_minutes(symbol, trade_date):
+    day = pd.Timestamp(trade_date).strftime('%Y-%m-%d')
+    df = fetch_scheduler.call("akshare", ak.stock_zh_a_hist_min_em, symbol=symbol, start_date=f"{day} 09:00:00",
+                              end_date=f"{day} 15:30:00", period="1", adjust="")
+    if df is None or df.empty:
+        return np.empty(0, dtype=MINUTE_DTYPE)
+    return to_records(df)
+
+
+def sync_symbol(symbol, trade_date=None):
+    """拉取当天分钟线并把新增部分追加进本地文件，返回追加条数"""
+    trade_date = trade_date or trade_calendar.latest_trading_day()
+    return append_records(symbol, trade_date, fetch_minutes(symbol, trade_date))
+
+
+def load_records(symbol, trade_date):
+    """一只股票一天的记录数组；已合并成分区的日子从分区里取"""
+    path = minute_path(symbol, trade_date)
+    if os.path.exists(path):
+        return np.fromfile(path, dtype=MINUTE_DTYPE, count=os.path.getsize(path) // MINUTE_DTYPE.itemsize)
+    codes, offsets, records = load_day_arrays(trade_date)
+    i = np.searchsorted(codes, symbol)
+    if i < len(codes) and codes[i] == symbol:
+        return records[offsets[i]:offsets[i + 1]]
+    return np.empty(0, dtype=MINUTE_DTYPE)
+
+
+def load_day_arrays(trade_date):
+    """全市场一天的分钟线：(代码数组, 偏移数组, 记录数组)，第 i 只股票是 records[offsets[i]:offsets[i+1]]"""
+    path = partition_path(trade_date)
+    if os.path.exists(path):
+        with np.load(path) as data:
+            return data['codes'], data['offsets'], data['records']
+
+    paths = sorted(glob.glob(os.path.join(MINUTE_STORE_DIR, _day(trade_date), "*.bin")))
+    codes = np.array([os.path.basename(p)[:-len(".bin")] for p in paths])
+    chunks = [np.fromfile(p, dtype=MINUTE_DTYPE, count=os.path.getsize(p) // MINUTE_DTYPE.itemsize) for p in paths]
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(c) for c in chunks])
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=MINUTE_DTYPE)
+    return codes, offsets, records
+
+
+def compact_day(trade_date):
+    """收盘后把一天的逐只文件合并成一个分区文件，合并成功后删除逐只文件"""
+    codes, offsets, records = load_day_arrays(trade_date)
+    if len(codes) == 0:
+        return 0
+    path = partition_path(trade_date)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, codes=codes, offsets=offsets, records=records)
+    os.replace(tmp_path, path)
+    for symbol in codes:
+        os.remove(minute_path(symbol, trade_date))
+    os.rmdir(os.path.join(MINUTE_STORE_DIR, _day(trade_date)))
+    return len(codes)
+
+
+def to_frame(records, trade_date, codes=None, offsets=None):
+    """记录数组转成 DataFrame[时间, 开盘, 最高, 最低, 收盘, 成交量, 成交额]，传入代码和偏移时带 代码 列"""
+    base = pd.Timestamp(trade_date).normalize()
+    df = pd.DataFrame({'时间': base + pd.to_timedelta(records['minute'].astype(np.int64), unit='m')})
+    for source, field in SOURCE_COLUMNS.items():
+        df[source] = records[field]
+    if codes is not None:
+        df.insert(0, '代码', np.repeat(codes, np.diff(offsets)))
+    return df[['代码', '时间', '开盘', '最高', '最低', '收盘', '成交量', '成交额'] if codes is not None
+              else ['时间', '开盘', '最高', '最低', '收盘', '成交量', '成交额']]
+
+
+def load_day(trade_date, symbols=None):
+    """全市场（或指定股票）一天的分钟线长表"""
+    codes, offsets, records = load_day_arrays(trade_date)
+    df = to_frame(records, trade_date, codes, offsets)
+    return df[df['代码'].isin(symbols)].reset_index(drop=True) if symbols is not None else df
+
+
+def _session_index(minutes):
+    """K线结束时刻 -> 当天第几分钟交易（09:31 为 1，15:00 为 240，开盘集合竞价 09:30 为 0）"""
+    morning = minutes - MORNING_OPEN
+    afternoon = minutes - AFTERNOON_OPEN + SESSION_MINUTES
+    return np.where(minutes <= MORNING_OPEN + SESSION_MINUTES, morning, afternoon)
+
+
+def _session_clock(index):
+    """交易分钟序号 -> 当天0点起的分钟数"""
+    return np.where(index <= SESSION_MINUTES, MORNING_OPEN + index, AFTERNOON_OPEN + index - SESSION_MINUTES)
+
+
+def resample_minutes(df, period, symbol_column=None):
+    """1分钟线合成 5/15/30/60 分钟线，不跨越午休；K线时间为周期结束时刻，与行情软件一致"""
+    if period not in RESAMPLE_PERIODS:
+        raise ValueError(f"不支持的分钟周期: {period}")
+    if period == 1 or df.empty:
+        return df
+    times = pd.to_datetime(df['时间'])
+    minutes = (times.dt.hour * 60 + times.dt.minute).to_numpy()
+    # 09:30 的开盘集合竞价并入第一根
+    bucket = np.maximum(_session_index(minutes) - 1, 0) // period
+    end_clock = _session_clock((bucket + 1) * period)
+    labels = times.dt.normalize() + pd.to_timedelta(end_clock, unit='m')
+
+    keys = ([df[symbol_column].to_numpy()] if symbol_column else []) + [labels.to_numpy()]
+    grouped = df.groupby(keys, sort=True)
+    bars = grouped.agg({'开盘': 'first', '最高': 'max', '最低': 'min', '收盘': 'last', '成交量': 'sum', '成交额': 'sum'})
+    bars.index = bars.index.set_names(([symbol_column] if symbol_column else []) + ['时间'])
+    return bars.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="盘中同步分钟线到本地")
+    parser.add_argument("--symbols", nargs="+", required=True, help="要同步的股票代码")
+    parser.add_argument("--interval", type=int, default=60, help="同步间隔（秒），0 表示只同步一次")
+    parser.add_argument("--compact", action="store_true", help="收盘后合并当天分区")
+    args = parser.parse_args()
+
+    trade_date = trade_calendar.latest_trading_day()
+    while True:
+        for symbol in args.symbols:
+            try:
+                sync_symbol(symbol, trade_date)
+            except Exception as e:
+                print(f"同步 {symbol} 分钟线失败: {e}")
+        if args.interval <= 0 or datetime.now().time() > datetime.strptime("15:05", "%H:%M").time():
+            break
+        time.sleep(args.interval)
+
+    if args.compact:
+        print(f"已合并 {compact_day(trade_date)} 只股票的分钟线")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+# 全市场价格面板
+# 仓库里的指标和回测都是一只股票一个DataFrame，做一次全市场扫描要构造几千个DataFrame。
+# 这里把本地日线整理成 交易日 × 股票 的二维数组，开高低收量每个字段一个 float32 的 .npy 文件，
+# 另存对齐的日期轴和代码轴。读取时用内存映射打开，几乎不花时间，多个进程还能共享同一份页缓存；
+# 取出的是零拷贝的NumPy视图，指标代码按列（axis=0）向量化计算，一次调用覆盖全部股票。
+# 没有数据的位置（未上市、停牌、已退市）为 NaN。
+#
+# 目录结构： data/panel/<复权方式>/manifest.json
+#           data/panel/<复权方式>/{open,high,low,close,volume,dates,symbols}.<构建号>.npy
+# 每次构建的文件名都带构建号，清单最后原子替换，读方只打开清单里那一次构建的文件，
+# 重建过程中打开面板也不会把新旧两批文件混在一起。
+#
+# 用法：
+#     panel = PricePanel()
+#     close = panel.field('close')                 # (交易日数, 股票数) 只读内存映射
+#     ma20 = rolling_mean(close, 20)               # 全市场20日均线
+#     panel.series('close', '600519')              # 单只股票，仍是视图
+#     close[:, panel.columns_of(df['股票代码'])]   # 任意写法的代码列一次映射成列号
+#
+# 构建（收盘后跑一次，读的是本地仓库，不走网络；不给 --start 时只建最近约3年）：
+#     python price_panel.py --start 20200101
+
+import argparse
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import bar_store
+import symbol_registry
+import trade_calendar
+from bar_store import DATE_COLUMN
+
+PANEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "panel")
+
+# 面板字段 -> 日线列名
+FIELDS = {
+    'open': '开盘',
+    'high': '最高',
+    'low': '最低',
+    'close': '收盘',
+    'volume': '成交量',
+}
+
+READ_WORKERS = 16
+
+# 不指定起始日期时面板覆盖的交易日数（约3年）；从1990年建起来行数多十倍，大部分还是空的
+DEFAULT_TRADING_DAYS = 750
+
+
+def _panel_dir(adjust):
+    return os.path.join(PANEL_DIR, adjust or "raw")
+
+
+def _array_path(directory, name, build_id):
+    return os.path.join(directory, f"{name}.{build_id}.npy")
+
+
+def _save_array(path, array):
+    # 先写临时文件再替换，正在读旧面板的进程不受影响
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def build_panel(symbols=None, start_date=None, end_date=None, adjust="qfq", workers=READ_WORKERS):
+    """从本地日线仓库构建面板并写盘，返回 (交易日数, 股票数)"""
+    symbols = sorted(symbols or bar_store.stored_symbols())
+    # 在构建时登记代码编号，打开面板只读注册表，不用拿注册表的文件锁
+    symbol_registry.ids(symbols)
+    end_date = end_date or bar_store.last_close_cutoff().date()
+    start_date = start_date or trade_calendar.offset_trading_day(end_date, -(DEFAULT_TRADING_DAYS - 1))
+    dates = np.array(trade_calendar.trading_days_between(start_date, end_date), dtype='datetime64[D]')
+
+    arrays = {field: np.full((len(dates), len(symbols)), np.nan, dtype=np.float32) for field in FIELDS}
+
+    def fill(item):
+        column, symbol = item
+        df = bar_store.load_bars(symbol, dates[0] if len(dates) else None, end_date,
+                                 [DATE_COLUMN] + list(FIELDS.values()), adjust)
+        if df.empty:
+            return
+        bar_dates = df[DATE_COLUMN].to_numpy().astype('datetime64[D]')
+        rows = np.searchsorted(dates, bar_dates)
+        # 不在交易日历里的日期（如数据源多出来的非交易日）会落到下一个交易日的行上，只保留日期完全对上的
+        valid = rows < len(dates)
+        valid[valid] = dates[rows[valid]] == bar_dates[valid]
+        for field, source in FIELDS.items():
+            arrays[field][rows[valid], column] = df[source].to_numpy(dtype=np.float32)[valid]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fill, enumerate(symbols)))
+
+    directory = _panel_dir(adjust)
+    os.makedirs(directory, exist_ok=True)
+    build_id = uuid.uuid4().hex[:12]
+    for field, array in arrays.items():
+        _save_array(_array_path(directory, field, build_id), array)
+    _save_array(_array_path(directory, "dates", build_id), dates)
+    _save_array(_array_path(directory, "symbols", build_id), np.array(symbols))
+    # 最后原子替换清单，读方按清单里的构建号打开同一批文件
+    manifest_path = os.path.join(directory, "manifest.json")
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"build_id": build_id, "shape": [len(dates), len(symbols)], "fields": list(FIELDS)}, f)
+    os.replace(tmp_path, manifest_path)
+    _remove_old_builds(directory, build_id)
+    return len(dates), len(symbols)
+
+
+def _remove_old_builds(directory, build_id):
+    """删掉以前构建的文件；已经映射旧文件的读者不受影响（Windows 上还在用的文件删不掉，下次再删）"""
+    for name in os.listdir(directory):
+        if name.endswith(".npy") and not name.endswith(f".{build_id}.npy") and ".tmp" not in name:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+class PricePanel:
+    def __init__(self, adjust="qfq"):
+        directory = _panel_dir(adjust)
+        for attempt in range(3):
+            with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            build_id = manifest["build_id"]
+            try:
+                self.dates = np.load(_array_path(directory, "dates", build_id))
+                self.symbols = np.load(_array_path(directory, "symbols", build_id))
+                self._fields = {field: np.load(_array_path(directory, field, build_id), mmap_mode='r')
+                                for field in manifest["fields"]}
+                break
+            except FileNotFoundError:
+                # 读清单和打开文件之间正好完成了一次重建，旧文件已删除，重读清单
+                if attempt == 2:
+                    raise
+        self.build_id = build_id
+        shape = tuple(manifest["shape"])
+        if (len(self.dates), len(self.symbols)) != shape or any(array.shape != shape for array in self._fields.values()):
+            raise ValueError("面板文件与清单不符，请重新运行 build_panel")
+        # 代码编号 -> 列号的稠密查找表，整列代码映射成列号时只做整数索引
+        self.symbol_ids = symbol_registry.ids(self.symbols, register=False)
+        self._column_by_id = np.full(int(self.symbol_ids.max(initial=-1)) + 1, -1, dtype=np.int32)
+        self._column_by_id[self.symbol_ids[self.symbol_ids >= 0]] = np.flatnonzero(self.symbol_ids >= 0)
+
+    @property
+    def shape(self):
+        return len(self.dates), len(self.symbols)
+
+    def field(self, name):
+        """整个字段的只读内存映射，形状 (交易日数, 股票数)"""
+        return self._fields[name]
+
+    def columns_of_ids(self, ids):
+        """代码编号数组 -> 列号数组，面板里没有的为 -1"""
+        ids = np.asarray(ids)
+        inside = (ids >= 0) & (ids < len(self._column_by_id))
+        return np.where(inside, self._column_by_id[np.where(inside, ids, 0)] if len(self._column_by_id) else -1, -1)
+
+    def columns_of(self, codes):
+        """任意写法的代码列 -> 列号数组，面板里没有的为 -1"""
+        return self.columns_of_ids(symbol_registry.ids(codes, register=False))
+
+    def column_of(self, symbol):
+        column = int(self.columns_of([symbol])[0])
+        if column < 0:
+            raise KeyError(symbol)
+        return column
+
+    def row_range(self, start_date=None, end_date=None):
+        """日期区间对应的行切片"""
+        start = 0 if start_date is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date).date()))
+        stop = len(self.dates) if end_date is None else \
+            np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date).date()), side='right')
+        return slice(int(start), int(stop))
+
+    def window(self, name, start_date=None, end_date=None):
+        """日期区间内全部股票的视图（基本切片，不复制数据）"""
+        return self._fields[name][self.row_range(start_date, end_date)]
+
+    def series(self, name, symbol, start_date=None, end_date=None):
+        """单只股票的视图"""
+        return self._fields[name][self.row_range(start_date, end_date), self.column_of(symbol)]
+
+    def to_frame(self, name, start_date=None, end_date=None):
+        """转成以日期为索引、代码为列的DataFrame（会复制数据，适合小窗口展示）"""
+        rows = self.row_range(start_date, end_date)
+        return pd.DataFrame(np.asarray(self._fields[name][rows]), index=pd.DatetimeIndex(self.dates[rows]),
+                            columns=self.symbols)
+
+
+def rolling_mean(values, window):
+    """沿交易日方向的滚动均值，窗口内有 NaN 时结果为 NaN，前 window-1 行为 NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.cumsum(np.nan_to_num(values), axis=0)
+    counts = np.cumsum(~np.isnan(values), axis=0)
+    result = np.full(values.shape, np.nan)
+    result[window - 1:] = sums[window - 1:]
+    result[window:] -= sums[:-window]
+    full = counts[window - 1:].copy()
+    full[1:] -= counts[:-window]
+    result[window - 1:][full < window] = np.nan
+    return (result / window).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="由本地日线构建全市场价格面板")
+    parser.add_argument("--start", help=f"起始日期，默认最近 {DEFAULT_TRADING_DAYS} 个交易日")
+    parser.add_argument("--end", help="结束日期，默认最近收盘日")
+    parser.add_argument("--adjust", default="qfq", choices=["qfq", "hfq", ""], help="复权方式，空字符串为不复权")
+    args = parser.parse_args()
+    rows, columns = build_panel(start_date=args.start, end_date=args.end, adjust=args.adjust)
+    print(f"面板已生成：{rows} 个交易日 × {columns} 只股票")
+
+
+if __name__ == "__main__":
+    main()
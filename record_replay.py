@@ -0,0 +1,245 @@
+# 数据源录制与回放
+# 仓库里的脚本离不开 akshare、tushare、问财的实时接口：没网跑不起来，每次跑的结果也不一样，
+# 性能优化前后根本没法对比。这里在 akshare、tushare、pywencai 三个模块外面套一层代理：
+# 录制模式照常请求数据源，把每次调用的返回值存成本地文件；回放模式不再联网（连这几个库都不需要装），
+# 按调用的函数名和参数取回录好的结果，还可以按固定延迟、随机抖动或录制时的真实耗时模拟网络等待。
+# 同一份录制可以反复回放，页面和数据管道就能离线、可重复地做性能分析。
+#
+# 返回 DataFrame 的调用存成 zstd 压缩的 Parquet，存不了 Parquet 的（列名不是字符串、混合类型等）和其他返回值用 pickle。
+# 同一个调用录了多次时以最后一次为准；回放时找不到录制会抛出 FixtureMissing。
+# 目录结构： data/fixtures/<调用名>-<参数哈希>.parquet|.pkl，data/fixtures/index.jsonl 记录每次调用的参数和耗时
+#
+# 运行（在脚本前加一层，脚本本身不用改）：
+#     python record_replay.py --mode record Code16.py
+#     python record_replay.py --mode replay --latency recorded --profile backfill.py --symbols 600519
+#     streamlit run record_replay.py -- --mode replay --latency 0.2 --jitter 0.1 Code31.py
+
+import argparse
+import cProfile
+import functools
+import hashlib
+import json
+import os
+import pickle
+import pstats
+import random
+import runpy
+import sys
+import threading
+import time
+
+import pandas as pd
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fixtures")
+
+MODES = ("off", "record", "replay")
+
+# 各数据源里不返回数据的函数：IGNORED 回放时直接返回 None，FACTORIES 返回的对象继续套代理
+SOURCES = {
+    "akshare": {"ignored": (), "factories": ()},
+    "tushare": {"ignored": ("set_token",), "factories": ("pro_api",)},
+    "pywencai": {"ignored": (), "factories": ()},
+}
+
+# 不影响返回结果的参数，不参与录制键
+IGNORED_KWARGS = ("cookie", "log", "token")
+
+PROFILE_LINES = 30
+
+
+class FixtureMissing(KeyError):
+    pass
+
+
+_state = {
+    "mode": "off",
+    "fixture_dir": FIXTURE_DIR,
+    "latency": 0.0,
+    "jitter": 0.0,
+    "random": random.Random(0),
+    "recorded": {},
+}
+_lock = threading.Lock()
+
+
+def fixture_key(name, args, kwargs):
+    """调用名加参数哈希，参数顺序不同但含义相同的关键字参数共用一份录制"""
+    kwargs = {key: value for key, value in kwargs.items() if key not in IGNORED_KWARGS}
+    raw = json.dumps([list(args), kwargs], ensure_ascii=False, sort_keys=True, default=str)
+    return f"{name}-{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _index_path():
+    return os.path.join(_state["fixture_dir"], "index.jsonl")
+
+
+def _save(key, name, args, kwargs, result, elapsed):
+    os.makedirs(_state["fixture_dir"], exist_ok=True)
+    base = os.path.join(_state["fixture_dir"], key)
+    suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+    path = None
+    if isinstance(result, pd.DataFrame):
+        try:
+            result.to_parquet(f"{base}.parquet.{suffix}", compression="zstd")
+            path = f"{base}.parquet"
+        except Exception:
+            if os.path.exists(f"{base}.parquet.{suffix}"):
+                os.remove(f"{base}.parquet.{suffix}")
+    if path is None:
+        path = f"{base}.pkl"
+        with open(f"{path}.{suffix}", "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    with _lock:
+        os.replace(f"{path}.{suffix}", path)
+        # 换了存储格式时删掉另一种格式的旧录制
+        for stale in (f"{base}.parquet", f"{base}.pkl"):
+            if stale != path and os.path.exists(stale):
+                os.remove(stale)
+        with open(_index_path(), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "call": name, "args": list(args), "kwargs": kwargs,
+                                "elapsed": round(elapsed, 4), "recorded_at": time.time()},
+                               ensure_ascii=False, default=str) + "\n")
+
+
+def _load(key, description):
+    base = os.path.join(_state["fixture_dir"], key)
+    if os.path.exists(f"{base}.parquet"):
+        return pd.read_parquet(f"{base}.parquet")
+    if os.path.exists(f"{base}.pkl"):
+        with open(f"{base}.pkl", "rb") as f:
+            return pickle.load(f)
+    raise FixtureMissing(f"没有录制过 {description}，请先用 --mode record 运行一次")
+
+
+def _recorded_latency():
+    """index.jsonl 里每个调用最后一次录制的耗时"""
+    latency = {}
+    if os.path.exists(_index_path()):
+        with open(_index_path(), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    latency[entry["key"]] = entry["elapsed"]
+    return latency
+
+
+def _sleep(key):
+    latency = _state["latency"]
+    delay = _state["recorded"].get(key, 0.0) if latency == "recorded" else float(latency)
+    if _state["jitter"]:
+        with _lock:
+            delay += _state["random"].uniform(0, _state["jitter"])
+    if delay > 0:
+        time.sleep(delay)
+
+
+class _Proxy:
+    """转发到真实模块或对象的代理；按模式录制或回放其中的函数调用"""
+
+    def __init__(self, target, name, source):
+        self._target = target
+        self._name = name
+        self._source = source
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        if self._target is not None:
+            value = getattr(self._target, attr)
+            if not callable(value):
+                return value
+        wrapper = functools.partial(_call, self, attr)
+        # 同一个函数只包装一次
+        self.__dict__[attr] = wrapper
+        return wrapper
+
+    def __repr__(self):
+        return f"<{_state['mode']} proxy for {self._name}>"
+
+
+def _call(proxy, attr, *args, **kwargs):
+    name = f"{proxy._name}.{attr}"
+    spec = SOURCES[proxy._source]
+    mode = _state["mode"]
+
+    if attr in spec["ignored"]:
+        return None if mode == "replay" else getattr(proxy._target, attr)(*args, **kwargs)
+    if attr in spec["factories"]:
+        target = None if mode == "replay" else getattr(proxy._target, attr)(*args, **kwargs)
+        return _Proxy(target, name, proxy._source)
+
+    key = fixture_key(name, args, kwargs)
+    if mode == "replay":
+        _sleep(key)
+        return _load(key, f"{name}(args={args}, kwargs={kwargs})")
+
+    started = time.perf_counter()
+    result = getattr(proxy._target, attr)(*args, **kwargs)
+    if mode == "record":
+        _save(key, name, args, {k: v for k, v in kwargs.items() if k not in IGNORED_KWARGS}, result,
+              time.perf_counter() - started)
+    return result
+
+
+def install(mode, fixture_dir=FIXTURE_DIR, latency=0.0, jitter=0.0, seed=0):
+    """给 akshare、tushare、pywencai 套上代理，要在脚本 import 它们之前调用；重复调用只更新设置"""
+    if mode not in MODES:
+        raise ValueError(f"不支持的模式: {mode}")
+    _state.update(mode=mode, fixture_dir=fixture_dir, latency=latency, jitter=jitter, random=random.Random(seed))
+    if mode == "off":
+        return
+    if mode == "replay" and latency == "recorded":
+        _state["recorded"] = _recorded_latency()
+
+    for source in SOURCES:
+        current = sys.modules.get(source)
+        if isinstance(current, _Proxy):
+            continue
+        if current is None and mode == "record":
+            try:
+                current = __import__(source)
+            except ImportError:
+                # 没装的库脚本也用不到，不用代理
+                continue
+        # 回放时不导入真实的库，没装这些库也能跑
+        sys.modules[source] = _Proxy(current if mode == "record" else None, source, source)
+
+
+def run_script(path, argv, profile=False):
+    """像 python <脚本> 一样运行，profile 时打印累计耗时最多的函数"""
+    directory = os.path.dirname(os.path.abspath(path))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    # streamlit 每次重跑都会重新执行本文件，运行完要把参数还原
+    saved_argv, sys.argv = sys.argv, [path] + list(argv)
+    profiler = cProfile.Profile() if profile else None
+    try:
+        if profiler is None:
+            runpy.run_path(path, run_name="__main__")
+        else:
+            profiler.runcall(runpy.run_path, path, run_name="__main__")
+    finally:
+        sys.argv = saved_argv
+        if profiler is not None:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_LINES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制或回放数据源调用后运行脚本")
+    parser.add_argument("--mode", default="replay", choices=MODES)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="录制文件目录")
+    parser.add_argument("--latency", default="0", help="回放时每次调用的延迟秒数，recorded 表示按录制时的耗时")
+    parser.add_argument("--jitter", type=float, default=0.0, help="在延迟上再加 0~jitter 秒的随机抖动")
+    parser.add_argument("--seed", type=int, default=0, help="抖动的随机种子，固定后每次回放一致")
+    parser.add_argument("--profile", action="store_true", help="用 cProfile 统计耗时")
+    parser.add_argument("script", help="要运行的脚本")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="传给脚本的参数")
+    args = parser.parse_args()
+
+    latency = args.latency if args.latency == "recorded" else float(args.latency)
+    install(args.mode, args.fixtures, latency, args.jitter, args.seed)
+    run_script(args.script, args.args, args.profile)
+
+
+if __name__ == "__main__":
+    main()
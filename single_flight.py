@@ -0,0 +1,65 @@
+# 相同请求合并
+# 开盘时好几个人同时打开 Code19 多页面应用或 Code31 市场概览，每个会话都在同一时刻各自调用
+# ak.stock_zh_a_spot_em 或同一个问财查询，数据源要为同一份数据应付 N 次请求。
+# 这里按键合并正在进行的请求：某个键的请求还没返回时，后来的调用不再发请求，而是等同一个 Future 的结果，
+# 数据源的压力只和不同键的个数有关，和用户数无关。请求失败时所有等待者都收到同一个异常，下一次调用重新发起。
+# Streamlit 的各个会话是同一进程里的线程，这里按进程内合并；跨进程共享快照见 data_plane。
+#
+# 用法：
+#     df = single_flight.do(("wencai", key), fetch, query)
+# 所有调用方拿到的是同一个对象，会修改结果的调用方要自己复制一份。
+
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        # 实际发起的请求数和搭便车的调用数
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fetch, *args, **kwargs):
+        """同一个键同时只执行一次 fetch(*args, **kwargs)，其余调用等待并共享结果"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fetch(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        """正在进行的请求键"""
+        with self._lock:
+            return list(self._calls)
+
+
+_default = SingleFlight()
+
+
+def do(key, fetch, *args, **kwargs):
+    return _default.do(key, fetch, *args, **kwargs)
+
+
+def stats():
+    """进程内默认合并器的 (实际请求数, 合并掉的调用数)"""
+    return _default.leaders, _default.followers
@@ -0,0 +1,135 @@
+# 行情快照的“先给旧的、后台再刷新”缓存
+# Code31.fetch_market_data 每次渲染都要等 ak.stock_zh_a_spot_em 把全市场快照下载完，
+# 其实二十几秒前的快照完全够用。这里给快照设两个时间：
+#   - 新鲜期内直接返回内存里的快照；
+#   - 过了新鲜期但没超过最长容忍时间，立刻返回旧快照，同时在后台线程刷新（同一快照同时只刷新一次）；
+#   - 超过最长容忍时间（或还没有快照）才阻塞等待拉取。
+# 返回值带着快照的年龄，页面可以显示“数据为 N 秒前”。
+# 缓存按名字登记在模块里，Streamlit 每次重跑脚本拿到的是同一个缓存，各会话共用。
+#
+# 用法：
+#     snapshot = snapshot_cache.spot_em()
+#     df = snapshot.value.copy()          # 缓存里的表各会话共用，要改先复制
+#     st.caption(f"行情快照更新于 {snapshot.age:.0f} 秒前")
+
+import threading
+import time
+from collections import namedtuple
+
+import akshare as ak
+
+import data_plane
+import fetch_scheduler
+import single_flight
+from frame_schema import normalize_spot_em
+
+# 全市场快照的新鲜期和最长容忍时间（秒）
+SPOT_FRESH_FOR = 20
+SPOT_MAX_STALE = 120
+
+# value: 缓存的数据；age: 距离数据产生的秒数；stale: 是否已过新鲜期；refreshing: 后台是否正在刷新
+Snapshot = namedtuple("Snapshot", ["value", "age", "stale", "refreshing"])
+
+
+class SnapshotCache:
+    """fetch() 拉取新数据；stamp(value) 给出数据产生的时间（time.time() 秒），默认取拉取完成的时间；
+    peek() 是可选的快速来源（如共享内存里别的进程发布的快照），冷启动时先用它，不必等网络。"""
+
+    def __init__(self, name, fetch, fresh_for, max_stale, stamp=None, peek=None):
+        self.name = name
+        self.fetch = fetch
+        self.fresh_for = fresh_for
+        self.max_stale = max_stale
+        self.stamp = stamp
+        self.peek = peek
+        self.last_error = None
+        self._value = None
+        self._produced_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _store(self, value):
+        if value is None:
+            return
+        produced_at = self.stamp(value) if self.stamp else time.time()
+        with self._lock:
+            # 后台刷新和阻塞拉取可能交错完成，只保留更新的那份
+            if self._produced_at is None or produced_at >= self._produced_at:
+                self._value, self._produced_at = value, produced_at
+
+    def _load(self):
+        self._store(single_flight.do(("snapshot", self.name), self.fetch))
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self._load()
+                self.last_error = None
+            except Exception as e:
+                # 刷新失败时继续提供旧快照，下次读取再试
+                self.last_error = e
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name=f"snapshot-{self.name}", daemon=True).start()
+
+    def age(self):
+        """当前快照的年龄（秒），还没有快照时为 None"""
+        with self._lock:
+            return None if self._produced_at is None else time.time() - self._produced_at
+
+    def get(self):
+        """按新鲜期和最长容忍时间返回 Snapshot"""
+        if self._produced_at is None and self.peek is not None:
+            self._store(self.peek())
+        age = self.age()
+        if age is None or age > self.max_stale:
+            self._load()
+        elif age > self.fresh_for:
+            self._refresh_in_background()
+
+        with self._lock:
+            if self._produced_at is None:
+                return Snapshot(None, None, True, self._refreshing)
+            age = time.time() - self._produced_at
+            return Snapshot(self._value, age, age > self.fresh_for, self._refreshing)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name, fetch, fresh_for, max_stale, stamp=None, peek=None):
+    """按名字取进程内共用的缓存，第一次调用时创建"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = SnapshotCache(name, fetch, fresh_for, max_stale, stamp, peek)
+        return _caches[name]
+
+
+def _publish_spot_em():
+    return data_plane.get_or_publish(
+        'spot_em', lambda: normalize_spot_em(fetch_scheduler.call("akshare", ak.stock_zh_a_spot_em)),
+        max_age=SPOT_FRESH_FOR)
+
+
+def _spot_frame(dataset):
+    """缓存里存复制出来的表，不引用共享内存，旧版本发布后可以随时释放"""
+    if dataset is None:
+        return None
+    frame = dataset.to_frame().copy()
+    frame.attrs['published_at'] = dataset.published_at
+    return frame
+
+
+def spot_em():
+    """全市场快照，value 是 DataFrame；别的进程刚发布到共享内存的快照也能直接用"""
+    return get_cache('spot_em', lambda: _spot_frame(_publish_spot_em()), SPOT_FRESH_FOR, SPOT_MAX_STALE,
+                     stamp=lambda frame: frame.attrs['published_at'],
+                     peek=lambda: _spot_frame(data_plane.attach('spot_em'))).get()
@@ -0,0 +1,44 @@
+# 实时行情快照索引
+# 监控程序每分钟拿到约5000行的全市场快照后，原来对每个自选股都做一次 df[df['代码'] == code] 全表扫描。
+# 这里把快照的每一列转成NumPy数组，再建一份 代码 -> 行号 的字典，查任意股票都是常数时间，
+# 自选股从几只增加到几千只，每次轮询的开销基本不变。
+
+import numpy as np
+
+
+class SpotIndex:
+    def __init__(self, df, code_column='代码'):
+        codes = df[code_column].astype(str).to_numpy()
+        self.codes = codes
+        self._arrays = {column: df[column].to_numpy() for column in df.columns}
+        # 代码按快照原样匹配，不做6位数字的模糊映射：新浪行情带 sh/sz/bj 前缀，
+        # "000001" 既可能是上证指数也可能是平安银行，必须写明交易所
+        self._rows = {code: i for i, code in enumerate(codes)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return code in self._rows
+
+    def row_of(self, code):
+        """代码对应的行号，找不到返回 None"""
+        return self._rows.get(code)
+
+    def rows_of(self, codes):
+        """一组代码对应的行号数组，找不到的为 -1"""
+        return np.fromiter((self._rows.get(code, -1) for code in codes), dtype=np.int64, count=len(codes))
+
+    def column(self, name):
+        return self._arrays[name]
+
+    def get(self, code, column, default=None):
+        i = self._rows.get(code)
+        return default if i is None else self._arrays[column][i]
+
+    def record(self, code):
+        """一只股票的整行数据，以 {列名: 值} 返回"""
+        i = self._rows.get(code)
+        if i is None:
+            return None
+        return {name: values[i] for name, values in self._arrays.items()}
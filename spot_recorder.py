@@ -0,0 +1,227 @@
+# 盘中全市场快照录制
+# Code1、Code12、Code31 取一次 ak.stock_zh_a_spot_em 快照用完就扔了，事后没法回放、画市场宽度曲线或复盘。
+# 这里按固定节拍轮询快照，写进内存里的列式环形缓冲区（股票代码做字典编码，每个字段一个 时间×股票 的数组），
+# 每攒满一段就落盘成压缩文件：价格转成分、成交量/成交额按时间做差分编码，再用 np.savez_compressed 压缩。
+# 内存占用固定，任意股票、任意时间段都可以从磁盘分段 + 内存尾部快速读出。
+#
+# 目录结构： data/spot/<交易日>/<段起始时间戳>.npz
+#
+# 运行： python spot_recorder.py --interval 30
+
+import argparse
+import glob
+import os
+import time
+from datetime import datetime
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+import fetch_scheduler
+import trade_calendar
+
+SPOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "spot")
+
+# 每段快照条数，攒满即落盘
+SEGMENT_SIZE = 60
+
+# 股票数量上限，环形缓冲区按此预分配
+MAX_SYMBOLS = 6000
+
+# 快照里要录制的字段 -> (存储名, 缩放倍数)；价格存为整数分
+FIELDS = {
+    '最新价': ('price', 100),
+    '成交量': ('volume', 1),
+    '成交额': ('amount', 1),
+}
+
+# 录制时段：集合竞价开始到收盘后几分钟，午间休市跳过
+OPEN_TIME = datetime.strptime('09:15', '%H:%M').time()
+LUNCH_START = datetime.strptime('11:31', '%H:%M').time()
+LUNCH_END = datetime.strptime('12:59', '%H:%M').time()
+CLOSE_TIME = datetime.strptime('15:05', '%H:%M').time()
+
+
+def _to_seconds(moment):
+    # 按本地时间原样转成秒数，读出时 pd.to_datetime(unit='s') 还原回同一个本地时间
+    return pd.Timestamp(moment).value // 10 ** 9
+
+
+def _encode(values, scale):
+    """浮点数组 -> (按时间差分后的int64数组, 有效位图)"""
+    valid = ~np.isnan(values)
+    ints = np.where(valid, np.round(np.nan_to_num(values) * scale), 0).astype(np.int64)
+    deltas = np.diff(ints, axis=0, prepend=np.zeros((1, ints.shape[1]), dtype=np.int64))
+    return deltas, np.packbits(valid, axis=None)
+
+
+def _decode(deltas, bits, scale):
+    ints = np.cumsum(deltas, axis=0)
+    valid = np.unpackbits(bits, count=ints.size).reshape(ints.shape).astype(bool)
+    return np.where(valid, ints / scale, np.nan)
+
+
+class SpotRecorder:
+    def __init__(self, fetch=ak.stock_zh_a_spot_em, segment_size=SEGMENT_SIZE, max_symbols=MAX_SYMBOLS,
+                 spot_dir=SPOT_DIR):
+        self.fetch = fetch
+        self.segment_size = segment_size
+        self.max_symbols = max_symbols
+        self.spot_dir = spot_dir
+        self.trade_date = None
+        self._reset()
+
+    def _reset(self):
+        # 代码字典：代码 -> 列号，新上市的股票追加在后面
+        self.codes = []
+        self._code_index = {}
+        self._timestamps = np.zeros(self.segment_size, dtype=np.int64)
+        self._buffers = {name: np.full((self.segment_size, self.max_symbols), np.nan)
+                         for name, _ in FIELDS.values()}
+        self._size = 0
+
+    def _columns_of(self, codes):
+        columns = np.empty(len(codes), dtype=np.int64)
+        for i, code in enumerate(codes):
+            column = self._code_index.get(code)
+            if column is None:
+                if len(self.codes) >= self.max_symbols:
+                    raise ValueError(f"股票数量超过 MAX_SYMBOLS={self.max_symbols}")
+                column = len(self.codes)
+                self._code_index[code] = column
+                self.codes.append(code)
+            columns[i] = column
+        return columns
+
+    def append(self, snapshot, timestamp=None):
+        """写入一份快照，缓冲区写满时自动落盘"""
+        timestamp = timestamp or datetime.now()
+        if self.trade_date != timestamp.date():
+            self.flush()
+            self.trade_date = timestamp.date()
+            self._reset()
+
+        columns = self._columns_of(snapshot['代码'].astype(str).tolist())
+        row = self._size
+        self._timestamps[row] = _to_seconds(timestamp)
+        for source, (name, _) in FIELDS.items():
+            buffer = self._buffers[name]
+            buffer[row] = np.nan
+            buffer[row, columns] = pd.to_numeric(snapshot[source], errors='coerce').to_numpy(dtype=float)
+        self._size += 1
+
+        if self._size == self.segment_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区里尚未落盘的快照写成一个压缩分段"""
+        if self._size == 0 or self.trade_date is None:
+            return
+        n, width = self._size, len(self.codes)
+        day_dir = os.path.join(self.spot_dir, self.trade_date.strftime('%Y%m%d'))
+        os.makedirs(day_dir, exist_ok=True)
+
+        arrays = {'codes': np.array(self.codes), 'timestamps': self._timestamps[:n]}
+        for name, scale in FIELDS.values():
+            deltas, bits = _encode(self._buffers[name][:n, :width], scale)
+            arrays[name] = deltas
+            arrays[f'{name}_valid'] = bits
+        path = os.path.join(day_dir, f"{self._timestamps[0]}.npz")
+        np.savez_compressed(path, **arrays)
+        self._size = 0
+
+    def _memory_frame(self):
+        n, width = self._size, len(self.codes)
+        if n == 0:
+            return None
+        arrays = {name: self._buffers[name][:n, :width] for name, _ in FIELDS.values()}
+        return self._timestamps[:n].copy(), np.array(self.codes), arrays
+
+    def run(self, interval=60):
+        """交易时间内按固定节拍录制，收盘后落盘退出"""
+        next_tick = time.monotonic()
+        while True:
+            now = datetime.now()
+            if not trade_calendar.is_trading_day(now.date()) or now.time() > CLOSE_TIME:
+                self.flush()
+                print("已收盘，录制结束")
+                return
+            if is_session_time(now):
+                try:
+                    self.append(fetch_scheduler.call("akshare", self.fetch), now)
+                except Exception as e:
+                    print(f"录制快照失败: {e}")
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+
+def is_session_time(now):
+    t = now.time()
+    return OPEN_TIME <= t <= CLOSE_TIME and not (LUNCH_START <= t <= LUNCH_END)
+
+
+def _load_segment(path):
+    with np.load(path) as data:
+        arrays = {name: _decode(data[name], data[f'{name}_valid'], scale) for name, scale in FIELDS.values()}
+        return data['timestamps'], data['codes'], arrays
+
+
+def read_range(trade_date, codes=None, start=None, end=None, recorder=None, spot_dir=SPOT_DIR):
+    """读取某个交易日的快照，返回长表 (时间, 代码, price, volume, amount)
+
+    codes 为空时返回全部股票；start/end 为 datetime，按分段起始时间跳过无关文件；
+    传入正在录制的 recorder 时，把内存里还没落盘的部分一起返回。
+    """
+    day_dir = os.path.join(spot_dir, pd.Timestamp(trade_date).strftime('%Y%m%d'))
+    paths = sorted(glob.glob(os.path.join(day_dir, "*.npz")), key=lambda p: int(os.path.basename(p)[:-4]))
+    start_ts = _to_seconds(start) if start is not None else None
+    end_ts = _to_seconds(end) if end is not None else None
+
+    # 段文件名是段内第一条快照的时间，下一个段的起点就是本段的上界
+    starts = [int(os.path.basename(p)[:-4]) for p in paths]
+    segments = []
+    for i, path in enumerate(paths):
+        if end_ts is not None and starts[i] > end_ts:
+            break
+        if start_ts is not None and i + 1 < len(starts) and starts[i + 1] <= start_ts:
+            continue
+        segments.append(_load_segment(path))
+    if recorder is not None and recorder.trade_date == pd.Timestamp(trade_date).date():
+        memory = recorder._memory_frame()
+        if memory is not None:
+            segments.append(memory)
+
+    frames = []
+    for timestamps, segment_codes, arrays in segments:
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start_ts is not None:
+            mask &= timestamps >= start_ts
+        if end_ts is not None:
+            mask &= timestamps <= end_ts
+        columns = np.arange(len(segment_codes)) if codes is None else np.flatnonzero(np.isin(segment_codes, codes))
+        if not mask.any() or len(columns) == 0:
+            continue
+        rows = np.flatnonzero(mask)
+        frame = pd.DataFrame({
+            '时间': np.repeat(pd.to_datetime(timestamps[rows], unit='s'), len(columns)),
+            '代码': np.tile(segment_codes[columns], len(rows)),
+        })
+        for name, values in arrays.items():
+            frame[name] = values[np.ix_(rows, columns)].ravel()
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame(columns=['时间', '代码'] + [name for name, _ in FIELDS.values()])
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="盘中全市场快照录制")
+    parser.add_argument("--interval", type=int, default=60, help="轮询间隔（秒）")
+    args = parser.parse_args()
+    SpotRecorder().run(args.interval)
+
+
+if __name__ == "__main__":
+    main()
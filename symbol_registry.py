@@ -0,0 +1,167 @@
+# 股票代码注册表
+# 同一只股票在仓库里至少有四种写法：akshare 的 600519、新浪日线的 sh600000、
+# 问财“股票代码”列的 600000.SH，以及 tushare 的 ts_code（与问财同样是 600000.SH）。
+# 各页面一直拿这些字符串做合并、去重和查找，格式一不一致就悄悄对不上。
+# 这里把任意写法的整列代码向量化地规范成 600519.SH，再映射成稠密的 int32 编号；
+# 合并、集合运算和面板列索引都在 int32 上做，字符串只在进出注册表时各哈希一次。
+#
+# 编号按首次出现的顺序分配，存在 data/symbols.csv，跨进程、跨会话保持不变。
+# 不带交易所的6位代码按号段推断交易所：6/9/5 开头为上交所，4/8/92 开头为北交所，其余为深交所。
+# 注意指数与个股可能同号（上证指数 000001 与平安银行 000001），指数请带上交易所前缀或后缀。
+#
+# 用法：
+#     symbol_registry.normalize(df['股票代码'])            # -> 600519.SH
+#     df['symbol_id'] = symbol_registry.ids(df['股票代码'])  # -> int32
+#     symbol_registry.codes_of(ids, style='prefix')         # -> sh600519
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symbols.csv")
+
+# 输出格式：ts 为 600519.SH（问财、tushare），prefix 为 sh600519（新浪），digits 为 600519（东财）
+STYLES = ("ts", "prefix", "digits")
+
+# 可选的交易所前缀（允许 sh600519、sh.600519）+ 6位数字 + 可选的交易所后缀
+CODE_PATTERN = r"^(?:(SH|SZ|BJ)\.?)?(\d{6})(?:\.(SH|SZ|BJ))?$"
+
+MISSING_ID = -1
+
+
+def _infer_exchange(digits):
+    """按号段推断交易所"""
+    first = digits.str[:1]
+    return pd.Series(np.select([digits.str[:2] == "92", first.isin(["4", "8"]), first.isin(["5", "6", "9"])],
+                               ["BJ", "BJ", "SH"], default="SZ"), index=digits.index)
+
+
+def normalize(codes):
+    """任意写法的代码列规范成 600519.SH，无法识别的为 NaN"""
+    codes = pd.Series(codes, copy=False) if not isinstance(codes, pd.Series) else codes
+    text = codes.astype(str).str.strip().str.upper()
+    # 数值型代码会丢掉前导零，补齐成6位
+    text = text.where(~text.str.fullmatch(r"\d{1,6}"), text.str.zfill(6))
+    parts = text.str.extract(CODE_PATTERN)
+    exchange = parts[0].fillna(parts[2])
+    exchange = exchange.fillna(_infer_exchange(parts[1].fillna("")))
+    canonical = parts[1] + "." + exchange
+    return canonical.where(parts[1].notna() & codes.notna())
+
+
+def format_codes(canonical, style="ts"):
+    """600519.SH 列转成指定格式"""
+    canonical = pd.Series(canonical, copy=False) if not isinstance(canonical, pd.Series) else canonical
+    if style == "ts":
+        return canonical
+    if style == "prefix":
+        return canonical.str[7:].str.lower() + canonical.str[:6]
+    if style == "digits":
+        return canonical.str[:6]
+    raise ValueError(f"不支持的代码格式: {style}")
+
+
+def to_style(codes, style="ts"):
+    """任意写法的代码列直接转成指定格式"""
+    return format_codes(normalize(codes), style)
+
+
+@contextmanager
+def _file_lock(path):
+    """跨进程的互斥锁，锁在旁边的 .lock 文件上，注册表文件本身会被整体替换"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SymbolRegistry:
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        symbols = pd.read_csv(self.path, dtype=str)["symbol"] if os.path.exists(self.path) else pd.Series([], dtype=str)
+        self._index = pd.Index(symbols.to_numpy(dtype=object))
+        self._symbols = self._index.to_numpy(dtype=object)
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def symbols(self):
+        """编号 -> 规范代码（600519.SH）"""
+        return self._symbols
+
+    def _register(self, new_symbols):
+        # 线程锁管本进程，文件锁管其他进程：重读、追加、替换必须一起完成，否则两个进程会给不同代码分到同一编号
+        with self._lock, _file_lock(self.path):
+            # 别的进程可能已经登记过，先重读再追加，保证同一代码只有一个编号
+            self._load()
+            new_symbols = [s for s in pd.unique(new_symbols) if s not in self._index]
+            if new_symbols:
+                all_symbols = pd.DataFrame({"symbol": np.concatenate([self._symbols, new_symbols])})
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                all_symbols.to_csv(tmp_path, index=False)
+                os.replace(tmp_path, self.path)
+                self._load()
+
+    def ids(self, codes, register=True):
+        """任意写法的代码列 -> int32 编号数组，无法识别（或未登记且 register=False）的为 -1"""
+        canonical = normalize(codes)
+        ids = self._index.get_indexer(canonical)
+        unknown = (ids < 0) & canonical.notna().to_numpy()
+        if register and unknown.any():
+            self._register(canonical[unknown].to_numpy())
+            ids = self._index.get_indexer(canonical)
+        ids[canonical.isna().to_numpy()] = MISSING_ID
+        return ids.astype(np.int32)
+
+    def codes_of(self, ids, style="ts"):
+        """int32 编号 -> 指定格式的代码列，-1 为 NaN"""
+        ids = np.asarray(ids)
+        canonical = pd.Series(np.where(ids >= 0, self._symbols[np.maximum(ids, 0)] if len(self._symbols) else None,
+                                       None), dtype=object)
+        return format_codes(canonical, style)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """进程内共享的注册表"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SymbolRegistry()
+        return _registry
+
+
+def ids(codes, register=True):
+    return get_registry().ids(codes, register)
+
+
+def codes_of(ids, style="ts"):
+    return get_registry().codes_of(ids, style)
@@ -0,0 +1,134 @@
+# 交易日历
+# 之前各个脚本判断交易日的方式五花八门：tushare trade_cal 逐日查询、chinese_calendar 逐天往前推、
+# pandas_market_calendars 每次重建、ak.tool_trade_date_hist_sina 每次下载。
+# 这里统一从本地缓存加载一次，保存成有序的交易日数组，前后交易日、偏移、区间查询都用二分查找。
+
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+import fetch_scheduler
+
+CALENDAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "trade_calendar.csv")
+
+# 缓存超过这个天数重新下载一次，防止临时调整的休市安排没有同步
+CALENDAR_MAX_AGE_DAYS = 30
+
+MARKET_OPEN = time(9, 30)
+
+# 进程内同时首次加载的线程只下载一次
+_load_lock = threading.Lock()
+
+
+def _to_date(day):
+    if isinstance(day, datetime):
+        return day.date()
+    if isinstance(day, date):
+        return day
+    return pd.Timestamp(day).date()
+
+
+def _cache_is_fresh():
+    if not os.path.exists(CALENDAR_PATH):
+        return False
+    age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(CALENDAR_PATH))
+    return age < timedelta(days=CALENDAR_MAX_AGE_DAYS)
+
+
+def _download_calendar():
+    df = fetch_scheduler.call("akshare", ak.tool_trade_date_hist_sina)
+    days = pd.to_datetime(df['trade_date']).dt.strftime('%Y%m%d')
+    os.makedirs(os.path.dirname(CALENDAR_PATH), exist_ok=True)
+    # 先写临时文件再替换，其他进程不会读到写了一半的日历
+    tmp_path = f"{CALENDAR_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    days.to_frame('trade_date').to_csv(tmp_path, index=False)
+    os.replace(tmp_path, CALENDAR_PATH)
+
+
+@lru_cache(maxsize=1)
+def _calendar():
+    """返回 (交易日列表, datetime64[D] 数组)，整个进程只加载一次"""
+    with _load_lock:
+        # lru_cache 挡不住同时到来的首次调用，排在后面的线程进来时缓存文件已经是新的
+        if not _cache_is_fresh():
+            try:
+                _download_calendar()
+            except Exception as e:
+                if not os.path.exists(CALENDAR_PATH):
+                    raise
+                print(f"更新交易日历失败，使用本地缓存: {e}")
+        days = pd.read_csv(CALENDAR_PATH, dtype=str)['trade_date']
+    array = np.unique(pd.to_datetime(days, format='%Y%m%d').values.astype('datetime64[D]'))
+    return array.astype(object).tolist(), array
+
+
+def trading_days():
+    """全部交易日，datetime64[D] 有序数组"""
+    return _calendar()[1]
+
+
+def is_trading_day(day):
+    days = _calendar()[0]
+    day = _to_date(day)
+    i = bisect_left(days, day)
+    return i < len(days) and days[i] == day
+
+
+def next_trading_day(day):
+    """严格晚于 day 的第一个交易日"""
+    days = _calendar()[0]
+    i = bisect_right(days, _to_date(day))
+    if i >= len(days):
+        raise ValueError(f"交易日历中没有 {day} 之后的交易日")
+    return days[i]
+
+
+def previous_trading_day(day):
+    """严格早于 day 的最后一个交易日"""
+    days = _calendar()[0]
+    i = bisect_left(days, _to_date(day))
+    if i == 0:
+        raise ValueError(f"交易日历中没有 {day} 之前的交易日")
+    return days[i - 1]
+
+
+def offset_trading_day(day, n):
+    """从 day 起偏移 n 个交易日；day 不是交易日时，先对齐到它之前的最后一个交易日"""
+    days = _calendar()[0]
+    i = bisect_right(days, _to_date(day)) - 1 + n
+    if i < 0 or i >= len(days):
+        raise ValueError(f"{day} 偏移 {n} 个交易日超出交易日历范围")
+    return days[i]
+
+
+def trading_days_between(start, end):
+    """[start, end] 闭区间内的交易日列表"""
+    days = _calendar()[0]
+    return days[bisect_left(days, _to_date(start)):bisect_right(days, _to_date(end))]
+
+
+def latest_trading_day(now=None):
+    """最近的交易日；交易日开盘前算作前一交易日"""
+    now = now or datetime.now()
+    today = now.date()
+    if is_trading_day(today) and now.time() >= MARKET_OPEN:
+        return today
+    return previous_trading_day(today)
+
+
+def to_ordinals(dates):
+    """把一组日期映射为交易日序号（对齐到当天或之前最近的交易日），向量化二分"""
+    values = pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]')
+    return np.searchsorted(trading_days(), values, side='right') - 1
+
+
+def is_trading_day_array(dates):
+    """一组日期是否为交易日，返回布尔数组"""
+    values = pd.to_datetime(pd.Series(dates)).values.astype('datetime64[D]')
+    return np.isin(values, trading_days())
@@ -0,0 +1,166 @@
+# 问财查询结果缓存
+# pywencai.get 每次要好几秒，还有频率限制，而同样的查询在各个页面里被反复调用。
+# 已经收盘定型的交易日，问财的答案不会再变，缓存后永不过期；当天盘中的查询只缓存很短的时间。
+# 结果以压缩Parquet存到 data/wencai 下，Streamlit 重启后历史数据也不用重新拉取。
+# 内存里只留最近用过的 MEMORY_MAX_ENTRIES 份结果，更早的从磁盘重读，长时间运行内存不会一直涨。
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+
+import pandas as pd
+import pywencai
+
+import fetch_scheduler
+import single_flight
+
+WENCAI_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "wencai")
+
+# 盘中（或不带日期）的查询缓存秒数
+LIVE_TTL_SECONDS = 60
+
+# 问财的涨停原因等字段收盘后还会补录一段时间，超过这个时间点抓取的数据才算定型
+SETTLE_TIME = time(17, 0)
+
+# 内存里最多保留的查询结果份数，超出时淘汰最久没用过的
+MEMORY_MAX_ENTRIES = 128
+
+# 这些参数会影响返回结果，需要参与缓存键；cookie、log 之类的不影响
+KEY_PARAMS = ("loop", "page", "perpage", "no_detail", "find")
+
+_DATE_PATTERN = re.compile(r"(?<!\d)(20\d{2})-?(\d{2})-?(\d{2})(?!\d)")
+
+# key -> (DataFrame, 抓取时间)，按最近使用排序
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def _remember(key, entry):
+    """放进内存缓存并标记为最近使用；调用方持有 _lock"""
+    _memory[key] = entry
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_MAX_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def normalize_query(query):
+    """去掉空白、统一全角标点，写法不同但含义相同的查询共用一份缓存"""
+    query = re.sub(r"\s+", "", str(query))
+    return query.replace("，", ",").replace("；", ";").replace("：", ":")
+
+
+def cache_key(query, sort_key=None, sort_order=None, query_type=None, **kwargs):
+    parts = {
+        "query": normalize_query(query),
+        "sort_key": sort_key,
+        "sort_order": sort_order,
+        "query_type": query_type,
+    }
+    parts.update({name: kwargs[name] for name in KEY_PARAMS if name in kwargs})
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def query_trade_day(query):
+    """查询里出现的最晚日期，没有日期时返回 None（视为查询最新行情）"""
+    days = []
+    for y, m, d in _DATE_PATTERN.findall(str(query)):
+        try:
+            days.append(date(int(y), int(m), int(d)))
+        except ValueError:
+            # "成交额大于20000000" 这类数字不是日期，跳过
+            continue
+    return max(days) if days else None
+
+
+def _is_valid(query, fetched_at, now=None):
+    now = now or datetime.now()
+    day = query_trade_day(query)
+    # 收盘定型之后抓取的历史交易日数据永不过期
+    if day is not None and fetched_at >= datetime.combine(day, SETTLE_TIME):
+        return True
+    return (now - fetched_at).total_seconds() < LIVE_TTL_SECONDS
+
+
+def _paths(key):
+    base = os.path.join(WENCAI_CACHE_DIR, key)
+    return f"{base}.parquet", f"{base}.pkl"
+
+
+def _load_from_disk(key):
+    for path in _paths(key):
+        if os.path.exists(path):
+            fetched_at = datetime.fromtimestamp(os.path.getmtime(path))
+            df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+            return df, fetched_at
+    return None, None
+
+
+def _save_to_disk(key, df):
+    os.makedirs(WENCAI_CACHE_DIR, exist_ok=True)
+    parquet_path, pickle_path = _paths(key)
+    tmp_path = f"{parquet_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        df.to_parquet(tmp_path, compression="zstd")
+        os.replace(tmp_path, parquet_path)
+        stale_path = pickle_path
+    except Exception:
+        # 问财偶尔返回混合类型的列，Parquet写不了时退回压缩pickle
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        df.to_pickle(pickle_path, compression="gzip")
+        stale_path = parquet_path
+    if os.path.exists(stale_path):
+        os.remove(stale_path)
+
+
+def lookup(query, sort_key=None, sort_order=None, query_type=None, **kwargs):
+    """只查缓存，命中且未过期时返回DataFrame副本，否则返回 None"""
+    key = cache_key(query, sort_key, sort_order, query_type, **kwargs)
+    with _lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+    if entry is None:
+        df, fetched_at = _load_from_disk(key)
+        if df is None:
+            return None
+        entry = (df, fetched_at)
+        with _lock:
+            _remember(key, entry)
+    df, fetched_at = entry
+    if not _is_valid(query, fetched_at):
+        return None
+    return df.copy()
+
+
+def _fetch_and_store(key, query, params, kwargs):
+    df = fetch_scheduler.call("wencai", pywencai.get, query=query, **params, **kwargs)
+
+    # 失败或空结果不缓存，下次重新请求
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return df
+
+    _save_to_disk(key, df)
+    with _lock:
+        _remember(key, (df, datetime.now()))
+    return df
+
+
+def get(query, sort_key=None, sort_order=None, query_type=None, **kwargs):
+    """带缓存的 pywencai.get，参数与 pywencai.get 一致"""
+    cached = lookup(query, sort_key, sort_order, query_type, **kwargs)
+    if cached is not None:
+        return cached
+
+    params = {name: value for name, value in
+              (("sort_key", sort_key), ("sort_order", sort_order), ("query_type", query_type))
+              if value is not None}
+    key = cache_key(query, sort_key, sort_order, query_type, **kwargs)
+    # 多个会话同时查同一个没缓存的问题时，只有一个真正请求问财，其余等它的结果
+    df = single_flight.do(("wencai", key), _fetch_and_store, key, query, params, kwargs)
+    return df.copy() if isinstance(df, pd.DataFrame) else df
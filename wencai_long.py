@@ -0,0 +1,87 @@
+# 问财宽表转长表
+# 问财返回的列名带日期后缀，例如 连续涨停天数[20240821]、涨停原因类别[20240821]，
+# 每天的结果列名都不一样，页面只能用 f'连续涨停天数[{date}]' 拼列名，跨天分析还要逐天改名再合并。
+# 这里把 [日期] 后缀挪到 trade_date 列里，字段名固定为去掉后缀的列名，类型按 frame_schema 统一；
+# 多天的结果直接上下拼成一张长表，跨天的问题变成一次 groupby。
+# 有 股票代码 列时同时带上 symbol_id（见 symbol_registry），跨天对比按 int32 键合并。
+#
+# 区间类的后缀（如 区间涨跌幅[20240801-20240821]）不是单个交易日，保留原列名不拆。
+#
+# 用法：
+#     long = wencai_long.load_days("{date}涨停，成交金额排序", [day1, day2], sort_key='成交金额', loop=True)
+#     long.groupby('trade_date')['连续涨停天数'].value_counts()
+
+import re
+
+import pandas as pd
+
+import symbol_registry
+import wencai_cache
+from concurrent_fetch import fetch_by_date
+from frame_schema import WENCAI_SCHEMA, normalize, normalize_wencai
+
+TRADE_DATE = 'trade_date'
+SYMBOL_ID = 'symbol_id'
+
+_DATED = re.compile(r'^(.*)\[(\d{8})\]$')
+
+
+def split_column(column):
+    """'连续涨停天数[20240821]' -> ('连续涨停天数', '20240821')，不带单日后缀的返回 (列名, None)"""
+    match = _DATED.match(str(column))
+    return (match.group(1), match.group(2)) if match else (str(column), None)
+
+
+def to_long(df, trade_date=None):
+    """一次问财结果转成长表：字段名去掉日期后缀，日期放进 trade_date 列。
+    指定 trade_date 时只取这一天的带后缀列；不指定时结果里出现的每个日期各占一组行。"""
+    if df is None:
+        return None
+    by_date = {}
+    for column in df.columns:
+        name, day = split_column(column)
+        if day is not None:
+            by_date.setdefault(day, {})[column] = name
+    fixed = [column for column in df.columns if split_column(column)[1] is None]
+
+    if trade_date is not None:
+        day = pd.Timestamp(trade_date).strftime('%Y%m%d')
+        by_date = {day: by_date.get(day, {})}
+    if not by_date:
+        by_date = {None: {}}
+
+    frames = []
+    for day, renames in sorted(by_date.items(), key=lambda item: item[0] or ''):
+        # 带后缀的同名字段优先，不带后缀的那列不再重复保留
+        columns = [column for column in fixed if column not in renames.values()] + list(renames)
+        frame = df[columns].rename(columns=renames)
+        frame.insert(0, TRADE_DATE, pd.Timestamp(day) if day else pd.NaT)
+        frames.append(frame)
+    long = normalize_wencai(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0])
+
+    if '股票代码' in long.columns:
+        long.insert(1, SYMBOL_ID, symbol_registry.ids(long['股票代码']))
+    return long
+
+
+def concat_days(frames):
+    """多天的长表拼成一张；各天的 category 类别不同，拼接后重新统一类型"""
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return pd.DataFrame({TRADE_DATE: pd.Series(dtype='datetime64[ns]')})
+    long = pd.concat(frames, ignore_index=True)
+    return normalize(long, WENCAI_SCHEMA).sort_values(TRADE_DATE, kind='stable').reset_index(drop=True)
+
+
+def load_days(query, days, **kwargs):
+    """按日期模板（含 {date}，格式 YYYYMMDD）并发查询多天问财并拼成长表，任一天失败时抛出该异常"""
+    def fetch(day):
+        day = pd.Timestamp(day)
+        df = wencai_cache.get(query=query.format(date=day.strftime('%Y%m%d')), **kwargs)
+        return to_long(df, day)
+
+    results = fetch_by_date(list(days), fetch)
+    for result in results:
+        if result.error is not None:
+            raise result.error
+    return concat_days(result.data for result in results)